@@ -9,8 +9,9 @@ from litestar import Litestar, get
 from litestar.config.cors import CORSConfig
 from litestar.openapi import OpenAPIConfig
 
-from database import init_db
-from controllers import BookController
+from database import init_db, shutdown_db, startup_db
+from controllers import AdminController, BookController
+from pagination import NEXT_CURSOR_HEADER
 
 
 @get("/")
@@ -24,7 +25,8 @@ async def hello_world() -> dict:
     return {
         "message": "Welcome to the Litestar + SQLAlchemy Demo API",
         "endpoints": {
-            "books": "/books"
+            "books": "/books",
+            "admin": "/admin"
         }
     }
 
@@ -32,8 +34,10 @@ async def hello_world() -> dict:
 # Configure CORS for the application
 cors_config = CORSConfig(
     allow_origins=["*"],
-    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+    allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
     allow_headers=["*"],
+    # Let browser clients read the cursor of the next page
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 
@@ -59,8 +63,10 @@ def create_app() -> Litestar:
     
     # Create the Litestar application
     app = Litestar(
-        route_handlers=[hello_world, BookController],
+        route_handlers=[hello_world, BookController, AdminController],
         cors_config=cors_config,
+        on_startup=[startup_db],
+        on_shutdown=[shutdown_db],
         debug=True,
         openapi_config=openapi_config
     )
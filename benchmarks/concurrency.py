@@ -0,0 +1,144 @@
+"""
+Compare request latency under concurrency for blocking and async sessions.
+
+Run from the project root:
+
+    python -m benchmarks.concurrency [--books 20000] [--requests 200] [--concurrency 20]
+
+A temporary database is seeded with books, then three scenarios are run
+in-process against the ASGI application. In each one, a burst of concurrent
+list requests (``limit=500``) is sent while a light request (``GET /``) is
+due every millisecond:
+
+* ``blocking`` serves the list from a handler that calls the synchronous
+  ``Session`` inside ``async def``, the way the controller used to;
+* ``async`` serves it through ``BookController`` with the aiosqlite engine;
+* ``threaded`` serves it through ``BookController`` with the synchronous
+  engine running in the database thread pools (``DB_EXECUTION=threaded``).
+
+The latency of the light requests shows how long the event loop was stalled
+by database work; the list requests show the overall throughput.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from typing import List
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """Return the given percentile of a list of samples."""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def report(name: str, label: str, samples: List[float]) -> None:
+    """Print latency percentiles in milliseconds."""
+    print(
+        f"{name:9} {label:6} n={len(samples):5} "
+        f"p50={percentile(samples, 0.50) * 1000:8.2f}ms "
+        f"p99={percentile(samples, 0.99) * 1000:8.2f}ms "
+        f"max={max(samples) * 1000:8.2f}ms "
+        f"mean={statistics.mean(samples) * 1000:8.2f}ms"
+    )
+
+
+async def run_scenario(client, name: str, path: str, requests: int, concurrency: int) -> None:
+    """Send the list requests and light requests of one scenario and report them."""
+    heavy_latencies: List[float] = []
+    light_latencies: List[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+    done = asyncio.Event()
+
+    async def heavy() -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.get(path, params={"limit": 500})
+            response.raise_for_status()
+            heavy_latencies.append(time.perf_counter() - started)
+
+    async def light() -> None:
+        # Measured from when the request was due, so time spent waiting
+        # for a blocked event loop counts towards its latency
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(0.001)
+            response = await client.get("/")
+            response.raise_for_status()
+            light_latencies.append(time.perf_counter() - started - 0.001)
+
+    pinger = asyncio.create_task(light())
+    started = time.perf_counter()
+    await asyncio.gather(*(heavy() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await pinger
+
+    report(name, "list", heavy_latencies)
+    report(name, "light", light_latencies)
+    print(f"{name:9} throughput={requests / elapsed:8.1f} list requests/s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--books", type=int, default=20_000)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    # Point the application at a scratch database before importing it
+    directory = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{directory}/benchmark.db"
+
+    import httpx
+    from litestar import Litestar, get
+    from sqlalchemy import insert
+
+    import database
+    from app import hello_world
+    from controllers import BookController
+    from database import SessionLocal, WriteSessionLocal, init_db
+    from models import Book
+
+    @get("/blocking/books")
+    async def blocking_books(limit: int = 500) -> List[dict]:
+        """List books with the synchronous session, blocking the event loop."""
+        session = SessionLocal()
+        try:
+            books = session.query(Book).order_by(Book.id).limit(limit).all()
+            return [book.to_dict() for book in books]
+        finally:
+            session.close()
+
+    init_db()
+    with WriteSessionLocal() as session:
+        session.execute(insert(Book), [
+            {
+                "title": f"Book {i}",
+                "author": f"Author {i % 500}",
+                "description": "Lorem ipsum dolor sit amet. " * 20,
+                "price": float(i % 100),
+                "published_year": 1900 + i % 120,
+            }
+            for i in range(args.books)
+        ])
+        session.commit()
+
+    application = Litestar(route_handlers=[hello_world, BookController, blocking_books])
+
+    async def run() -> None:
+        transport = httpx.ASGITransport(app=application)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            await run_scenario(client, "blocking", "/blocking/books", args.requests, args.concurrency)
+            for mode in ("async", "threaded"):
+                database.DB_EXECUTION = mode
+                await run_scenario(client, mode, "/books/", args.requests, args.concurrency)
+        await database.shutdown_db()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
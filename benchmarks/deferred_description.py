@@ -0,0 +1,162 @@
+"""
+Measure what leaving the description out of the book list saves.
+
+Run from the project root:
+
+    python -m benchmarks.deferred_description [--books 20000] [--sizes 500 4000 16000]
+
+Every description size is run in its own process (``DATABASE_URL`` is read
+at import time) against a temporary database seeded with books whose
+descriptions have that size, made of random words so that they compress
+about as well as prose does. Pages of the book list are read through
+``repository.list_books`` with every column, as ``?include=description``
+does, and without the description, as the list does by default. The script
+reports for both:
+
+* the database pages read per list page, counted from the bytes the
+  process reads from files (``rchar`` in ``/proc/self/io``, so Linux only)
+  on a fresh connection whose page cache is empty;
+* the latency of a list page once SQLite's page cache is warm.
+
+The average size descriptions are stored with, after compression, is
+reported as well.
+
+SQLite stores a value too large for its row's page in overflow pages, so
+descriptions of a few kilobytes are where skipping the column stops SQLite
+from reading pages it would otherwise need.
+"""
+import argparse
+import os
+import random
+import string
+import subprocess
+import sys
+import tempfile
+import time
+
+# Books per list page and number of pages measured
+PAGE_SIZE = 100
+PAGES = 20
+
+# Distinct descriptions seeded for each size, repeated across the books
+DESCRIPTIONS = 50
+
+# Number of words the descriptions are drawn from
+VOCABULARY = 2_000
+
+
+def random_descriptions(size: int, seed: int = 0) -> list:
+    """Return texts of ``size`` characters made of words drawn at random."""
+    generator = random.Random(seed)
+    words = [
+        "".join(generator.choices(string.ascii_lowercase, k=generator.randint(2, 10)))
+        for _ in range(VOCABULARY)
+    ]
+    texts = []
+    for _ in range(DESCRIPTIONS):
+        text = ""
+        while len(text) < size:
+            text += " ".join(generator.choices(words, k=size // 4)) + " "
+        texts.append(text[:size])
+    return texts
+
+
+def read_bytes() -> int:
+    """Return the number of bytes this process has read from files."""
+    with open("/proc/self/io") as io:
+        for line in io:
+            if line.startswith("rchar:"):
+                return int(line.split()[1])
+    return 0
+
+
+def run_size(args: argparse.Namespace) -> None:
+    """Seed a database with descriptions of ``args.size`` characters and read it."""
+    from sqlalchemy import func, insert, select, text
+
+    import repository
+    from database import SessionLocal, WriteSessionLocal, engine, init_db
+    from fieldsets import collection_fields
+    from models import Book
+
+    init_db()
+    descriptions = random_descriptions(args.size)
+    with WriteSessionLocal() as session:
+        for start in range(0, args.books, 5_000):
+            session.execute(insert(Book), [
+                {
+                    "title": f"Book {i}",
+                    "author": f"Author {i % 500}",
+                    "description": descriptions[i % DESCRIPTIONS],
+                    "price": float(i % 100),
+                    "published_year": 1900 + i % 120,
+                }
+                for i in range(start, min(args.books, start + 5_000))
+            ])
+        session.commit()
+        stored = session.scalar(select(func.avg(func.length(Book.__table__.c.description))))
+    print(f"description={args.size:6}B stored={stored:8.0f}B", flush=True)
+
+    # Bytes read by read_bytes() itself, subtracted from every measurement
+    first = read_bytes()
+    overhead = read_bytes() - first
+
+    def read_pages(fields, cold: bool) -> tuple:
+        pages_read = 0.0
+        elapsed = 0.0
+        after = None
+        for _ in range(PAGES):
+            if cold:
+                engine.dispose()
+            with SessionLocal() as session:
+                # Load the schema first so only the list query is counted
+                page_size = session.execute(text("PRAGMA page_size")).scalar()
+                before = read_bytes()
+                started = time.perf_counter()
+                page = repository.list_books(session, "id", PAGE_SIZE, after, fields)
+                elapsed += time.perf_counter() - started
+                pages_read += (read_bytes() - before - overhead) / page_size
+            after = page.next_cursor
+        return pages_read / PAGES, elapsed / PAGES
+
+    for name, fields in (("with", None), ("without", collection_fields(None, []))):
+        pages, _ = read_pages(fields, cold=True)
+        read_pages(fields, cold=False)
+        _, latency = read_pages(fields, cold=False)
+        print(
+            f"description={args.size:6}B {name:7} description "
+            f"pages_read={pages:7.1f}/page latency={latency * 1000:6.2f}ms/page",
+            flush=True
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--books", type=int, default=20_000)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500, 4_000, 16_000])
+    parser.add_argument("--size", type=int, help="Run a single description size in this process")
+    args = parser.parse_args()
+
+    if args.size is not None:
+        run_size(args)
+        return
+
+    for size in args.sizes:
+        # A fresh process and database for each size. SQLite's own pragmas
+        # leave memory-mapped I/O off, which would hide page reads from rchar.
+        directory = tempfile.mkdtemp()
+        environment = dict(
+            os.environ,
+            DB_PROFILE="sqlite",
+            DATABASE_URL=f"sqlite:///{directory}/benchmark.db"
+        )
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.deferred_description",
+             "--books", str(args.books), "--size", str(size)],
+            env=environment,
+            check=True
+        )
+
+
+if __name__ == "__main__":
+    main()
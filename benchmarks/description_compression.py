@@ -0,0 +1,123 @@
+"""
+Measure the space and read time of compressed descriptions.
+
+Run from the project root:
+
+    python -m benchmarks.description_compression [--books 20000]
+
+A temporary database is seeded with books whose descriptions are generated
+from a shared vocabulary and shared boilerplate, between 100 and 3000
+characters long, and written as plain text the way databases created
+before compression hold them. The script then measures three stages:
+
+* ``plain``: the descriptions as written;
+* ``zlib``: after ``recompress.recompress`` with no dictionary trained,
+  so every long description is compressed on its own;
+* ``zlib+dict``: after ``recompress.train`` and another
+  ``recompress.recompress``, compressed against the trained dictionary.
+
+For each stage it reports the pages of the ``books`` table (from
+``dbstat``), the size of the database file and its write-ahead log after
+``VACUUM`` and a checkpoint, and the time to read every description back
+as text.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+# Words and sentences the descriptions are built from
+VOCABULARY = (
+    "the a of and in to with his her their story novel young old world city war love family "
+    "secret journey empire kingdom ancient dark light sea river mountain desert planet ship "
+    "hero daughter son king queen magic history life death friendship betrayal power truth "
+    "century village island forest winter summer night dream memory stranger letter house"
+).split()
+BOILERPLATE = (
+    "A sweeping tale of courage and sacrifice.",
+    "Now a major motion picture.",
+    "Winner of the National Book Award.",
+    "From the bestselling author of many acclaimed novels.",
+    "Includes a reading group guide and an interview with the author.",
+)
+
+
+def describe(rng: random.Random) -> str:
+    """Return a random description."""
+    parts = []
+    length = rng.randint(100, 3_000)
+    while sum(len(part) + 1 for part in parts) < length:
+        if rng.random() < 0.1:
+            parts.append(rng.choice(BOILERPLATE))
+        else:
+            words = rng.choices(VOCABULARY, k=rng.randint(5, 15))
+            parts.append(" ".join(words).capitalize() + ".")
+    return " ".join(parts)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--books", type=int, default=20_000)
+    args = parser.parse_args()
+
+    # Point the application at a scratch database before importing it
+    directory = tempfile.mkdtemp()
+    path = f"{directory}/benchmark.db"
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+
+    from sqlalchemy import select
+
+    import recompress
+    from database import SessionLocal, init_db, write_engine
+    from models import Book
+    from search import rebuild_search_index
+
+    init_db()
+    rng = random.Random(0)
+    with write_engine.begin() as connection:
+        # Plain text, bypassing the column type as an older database would
+        connection.exec_driver_sql(
+            "INSERT INTO books (title, author, description) VALUES (?, ?, ?)",
+            [(f"Book {i}", f"Author {i % 500}", describe(rng)) for i in range(args.books)]
+        )
+    # Rows written behind the application's back are not indexed yet
+    rebuild_search_index(write_engine)
+
+    def measure(stage: str) -> None:
+        with write_engine.connect() as connection:
+            connection.exec_driver_sql("VACUUM")
+            # In WAL mode VACUUM writes the new pages to the log, so move them
+            # into the database file before measuring it
+            connection.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+            pages = connection.exec_driver_sql(
+                "SELECT count(*) FROM dbstat WHERE name = 'books'"
+            ).scalar()
+        size = sum(
+            os.path.getsize(name) for name in (path, f"{path}-wal") if os.path.exists(name)
+        )
+
+        best = float("inf")
+        for _ in range(3):
+            with SessionLocal() as session:
+                started = time.perf_counter()
+                for _ in session.scalars(select(Book.description)):
+                    pass
+                best = min(best, time.perf_counter() - started)
+
+        print(
+            f"{stage:9} books_pages={pages:7} file={size / 1024 / 1024:7.2f}MiB "
+            f"read={best / args.books * 1_000_000:6.2f}us/description",
+            flush=True
+        )
+
+    measure("plain")
+    recompress.recompress()
+    measure("zlib")
+    recompress.train()
+    recompress.recompress()
+    measure("zlib+dict")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Measure write throughput and latency with and without group commit.
+
+Run from the project root:
+
+    python -m benchmarks.group_commit [--writes 2000] [--concurrency 50]
+
+A temporary database is seeded with books, then the same burst of concurrent
+writes (alternating ``create_book`` and ``update_book``) is sent through
+``Database.write_grouped`` in several scenarios:
+
+* ``off`` gives every write its own transaction, as with
+  ``DB_GROUP_COMMIT=off``;
+* ``window=<ms>`` batches the writes arriving within that many
+  milliseconds, up to ``--max-batch`` per transaction.
+
+Each scenario reports the throughput, the write latency percentiles and the
+mean batch size.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from typing import List
+
+from benchmarks.concurrency import percentile
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--books", type=int, default=1_000)
+    parser.add_argument("--writes", type=int, default=2_000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--windows", type=float, nargs="+", default=[0.0, 2.0, 5.0])
+    args = parser.parse_args()
+
+    # Point the application at a scratch database before importing it
+    directory = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{directory}/benchmark.db"
+
+    from sqlalchemy import insert
+
+    import database
+    import repository
+    from database import WriteSessionLocal, get_db, init_db
+    from group_commit import GroupCommitter
+    from models import Book
+
+    init_db()
+    with WriteSessionLocal() as session:
+        session.execute(insert(Book), [
+            {"title": f"Book {i}", "author": f"Author {i % 500}", "price": 10.0}
+            for i in range(args.books)
+        ])
+        session.commit()
+
+    async def write(i: int, latencies: List[float]) -> None:
+        started = time.perf_counter()
+        async for db in get_db():
+            if i % 2:
+                await db.write_grouped(repository.update_book, i % args.books + 1, {"price": float(i)})
+            else:
+                await db.write_grouped(repository.create_book, {"title": f"New {i}", "author": "Writer"})
+        latencies.append(time.perf_counter() - started)
+
+    async def run_scenario(name: str) -> None:
+        latencies: List[float] = []
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def client(i: int) -> None:
+            async with semaphore:
+                await write(i, latencies)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client(i) for i in range(args.writes)))
+        elapsed = time.perf_counter() - started
+
+        committer = database.group_committer
+        mean_batch = committer.stats()["mean_batch"] if committer is not None else 1.0
+        print(
+            f"{name:12} throughput={args.writes / elapsed:8.0f} writes/s "
+            f"p50={percentile(latencies, 0.50) * 1000:7.2f}ms "
+            f"p99={percentile(latencies, 0.99) * 1000:7.2f}ms "
+            f"mean_batch={mean_batch:5.1f}"
+        )
+
+    async def run() -> None:
+        database.group_committer = None
+        await run_scenario("off")
+        for window in args.windows:
+            database.group_committer = GroupCommitter(
+                database.execute_batch,
+                window=window / 1000,
+                max_batch=args.max_batch
+            )
+            await run_scenario(f"window={window:g}ms")
+            await database.group_committer.shutdown()
+        database.group_committer = None
+        await database.shutdown_db()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
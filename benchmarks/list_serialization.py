@@ -0,0 +1,100 @@
+"""
+Compare the throughput of the ways a list of books can be serialized.
+
+Run from the project root:
+
+    python -m benchmarks.list_serialization [--books 1000] [--requests 200]
+
+The books are read once from a temporary database and kept in memory, then
+served by a small application through Litestar's test client, so every
+variant pays the same request overhead and only the serialization differs:
+
+* ``to_dict`` returns ``[book.to_dict() for book in books]``, the
+  hand-written conversion the handlers used to run;
+* ``row_to_dict`` converts Core rows with ``serialization.row_to_dict``;
+* ``dto`` returns the ``Book`` instances through ``dto.BookDTO`` with
+  Litestar's generic transfer backend;
+* ``dto_codegen`` does the same with the code-generated backend that
+  ``dto.book_dto`` configures.
+
+The script reports the number of books serialized per second.
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+from typing import Annotated, List
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--books", type=int, default=1_000)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    # Point the application at a scratch database before importing it
+    directory = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{directory}/benchmark.db"
+    logging.disable(logging.CRITICAL)
+
+    from litestar import Litestar, get
+    from litestar.dto import DTOConfig
+    from litestar.testing import TestClient
+    from sqlalchemy import insert, select
+
+    from database import SessionLocal, WriteSessionLocal, init_db
+    from dto import BookDTO, book_dto
+    from models import Book
+    from serialization import row_to_dict
+
+    init_db()
+    with WriteSessionLocal() as session:
+        session.execute(insert(Book), [
+            {
+                "title": f"Book {i}",
+                "author": f"Author {i % 500}",
+                "description": "Lorem ipsum dolor sit amet. " * 20,
+                "price": float(i % 100),
+                "published_year": 1900 + i % 120,
+            }
+            for i in range(args.books)
+        ])
+        session.commit()
+
+    with SessionLocal() as session:
+        books = list(session.scalars(select(Book).order_by(Book.id)))
+        rows = session.execute(select(Book.__table__).order_by(Book.id)).all()
+        session.expunge_all()
+
+    generic_dto = BookDTO[Annotated[Book, DTOConfig(experimental_codegen_backend=False)]]
+
+    @get("/to_dict", sync_to_thread=False)
+    def with_to_dict() -> List[dict]:
+        return [book.to_dict() for book in books]
+
+    @get("/row_to_dict", sync_to_thread=False)
+    def with_row_to_dict() -> List[dict]:
+        return [row_to_dict(row) for row in rows]
+
+    @get("/dto", return_dto=generic_dto, sync_to_thread=False)
+    def with_dto() -> List[Book]:
+        return books
+
+    @get("/dto_codegen", return_dto=book_dto(), sync_to_thread=False)
+    def with_dto_codegen() -> List[Book]:
+        return books
+
+    app = Litestar([with_to_dict, with_row_to_dict, with_dto, with_dto_codegen])
+    with TestClient(app) as client:
+        for name in ("to_dict", "row_to_dict", "dto", "dto_codegen"):
+            client.get(f"/{name}").raise_for_status()
+            started = time.perf_counter()
+            for _ in range(args.requests):
+                client.get(f"/{name}")
+            elapsed = time.perf_counter() - started
+            print(f"{name:12} {args.books * args.requests / elapsed:10.0f} books/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Compare the SQLite pragma profiles on a mix of CRUD requests.
+
+Run from the project root:
+
+    python -m benchmarks.pragma_profiles [--books 20000] [--requests 5000] [--concurrency 20]
+
+Every profile of ``database.PRAGMA_PROFILES`` is run in its own process
+(``DB_PROFILE`` is read at import time) against a freshly seeded temporary
+database. Each process sends the same shuffled mix of requests through the
+ASGI application: 40% ``GET /books/{id}``, 20% ``GET /books`` pages, 20%
+``POST /books``, 15% ``PUT /books/{id}`` and 5% ``DELETE /books/{id}``, and
+reports the throughput and the read and write latency percentiles.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List
+
+from benchmarks.concurrency import percentile
+
+# Share of each request type in the mix
+MIX = {"get": 40, "list": 20, "create": 20, "update": 15, "delete": 5}
+
+
+def run_profile(args: argparse.Namespace) -> None:
+    """Seed a database and run the request mix with the current DB_PROFILE."""
+    import httpx
+    from sqlalchemy import insert
+
+    import database
+    from app import app
+    from database import WriteSessionLocal
+    from models import Book
+
+    # Requests for deleted books are expected; keep their 404s (and the
+    # request log) off the output
+    logging.disable(logging.CRITICAL)
+
+    with WriteSessionLocal() as session:
+        session.execute(insert(Book), [
+            {
+                "title": f"Book {i}",
+                "author": f"Author {i % 500}",
+                "description": "Lorem ipsum dolor sit amet. " * 20,
+                "price": float(i % 100),
+                "published_year": 1900 + i % 120,
+            }
+            for i in range(args.books)
+        ])
+        session.commit()
+
+    random.seed(0)
+    kinds = random.choices(list(MIX), weights=list(MIX.values()), k=args.requests)
+    reads: List[float] = []
+    writes: List[float] = []
+
+    async def request(client, kind: str, i: int) -> None:
+        book_id = random.randint(1, args.books)
+        started = time.perf_counter()
+        if kind == "get":
+            await client.get(f"/books/{book_id}")
+        elif kind == "list":
+            await client.get("/books/", params={"author": f"Author {i % 500}", "limit": 50})
+        elif kind == "create":
+            await client.post("/books/", json={"title": f"New {i}", "author": "Writer"})
+        elif kind == "update":
+            await client.put(f"/books/{book_id}", json={"price": float(i)})
+        else:
+            await client.delete(f"/books/{book_id}")
+        (reads if kind in ("get", "list") else writes).append(time.perf_counter() - started)
+
+    async def run() -> float:
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def client_task(client, kind: str, i: int) -> None:
+            async with semaphore:
+                await request(client, kind, i)
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            started = time.perf_counter()
+            await asyncio.gather(*(client_task(client, kind, i) for i, kind in enumerate(kinds)))
+            elapsed = time.perf_counter() - started
+        await database.shutdown_db()
+        return elapsed
+
+    elapsed = asyncio.run(run())
+    print(
+        f"{database.DB_PROFILE:9} throughput={args.requests / elapsed:7.0f} req/s "
+        f"read p50={percentile(reads, 0.50) * 1000:6.2f}ms p99={percentile(reads, 0.99) * 1000:7.2f}ms "
+        f"write p50={percentile(writes, 0.50) * 1000:6.2f}ms p99={percentile(writes, 0.99) * 1000:7.2f}ms",
+        flush=True
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--books", type=int, default=20_000)
+    parser.add_argument("--requests", type=int, default=5_000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--profile", help="Run a single profile in this process")
+    args = parser.parse_args()
+
+    if args.profile:
+        run_profile(args)
+        return
+
+    from database import PRAGMA_PROFILES
+
+    for profile in PRAGMA_PROFILES:
+        # A fresh process and database for each profile
+        directory = tempfile.mkdtemp()
+        environment = dict(
+            os.environ,
+            DB_PROFILE=profile,
+            DATABASE_URL=f"sqlite:///{directory}/benchmark.db"
+        )
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.pragma_profiles", "--profile", profile,
+             "--books", str(args.books), "--requests", str(args.requests),
+             "--concurrency", str(args.concurrency)],
+            env=environment,
+            check=True
+        )
+
+
+if __name__ == "__main__":
+    main()
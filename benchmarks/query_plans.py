@@ -0,0 +1,114 @@
+"""
+Check that every supported filter combination on GET /books uses an index.
+
+Run from the project root:
+
+    python -m benchmarks.query_plans
+
+For each combination of filters and sort keys, the statements
+``repository.list_books`` can run for the first page and for a page after
+a cursor are passed through SQLite's EXPLAIN QUERY PLAN, on a temporary
+database with the application's schema. The script prints the plans and
+exits with a non-zero status if any of them is not what it is meant to be:
+
+* read in sort order, the books must come out of the sort key's index,
+  without a temporary B-tree (a scan of the table is the order of ``id``);
+* read through the ranges, used when they are the only filters that
+  narrow the sort key's index and match few books, a range must be
+  answered from its index, and sorting the matches is expected.
+"""
+import itertools
+import os
+import sys
+import tempfile
+from typing import Optional, Set
+
+# Sample arguments for each filter, keyed by a short label
+FILTER_VALUES = {
+    "author": {"author": "George Orwell"},
+    "title_prefix": {"title_prefix": "The"},
+    "year": {"min_year": 1900, "max_year": 1950},
+    "price": {"min_price": 5.0, "max_price": 20.0},
+}
+
+# Sample cursor key values for each sort key
+CURSOR_VALUES = {
+    "id": [1],
+    "title": ["M", 1],
+    "author": ["M", 1],
+    "published_year": [1925, 1],
+    "price": [10.0, 1],
+}
+
+
+def problem(plan: list, sort_key: str, ranged: Optional[Set[str]]) -> str:
+    """
+    Return what is wrong with a plan, or an empty string.
+
+    ``ranged`` holds the columns of the ranges the books are read through,
+    or is None when they are read in sort order.
+    """
+    if ranged is not None:
+        if not any(f"INDEX ix_books_{name} (" in step for step in plan for name in ranged):
+            return "NO RANGE"
+        return ""
+    if any(step.startswith("SCAN books") and "INDEX" not in step for step in plan):
+        # The table itself is in the order of the ID
+        return "" if sort_key == "id" else "FULL SCAN"
+    if any(step.startswith("USE TEMP B-TREE") for step in plan):
+        return "SORT"
+    return ""
+
+
+def main() -> int:
+    # Point the application at a scratch database before importing it
+    directory = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{directory}/benchmark.db"
+
+    from litestar.exceptions import ValidationException
+
+    from database import engine, init_db
+    from filters import range_columns
+    from pagination import SORT_KEYS, encode_cursor
+    from repository import list_books_query
+
+    init_db()
+    failures = 0
+
+    with engine.connect() as connection:
+        for size in range(len(FILTER_VALUES) + 1):
+            for combination in itertools.combinations(FILTER_VALUES, size):
+                kwargs = {}
+                for name in combination:
+                    kwargs.update(FILTER_VALUES[name])
+                label = "+".join(combination) or "(none)"
+                ranged = range_columns(**kwargs)
+                for sort, in_sort_order, page in itertools.product(
+                    SORT_KEYS, (True, False), ("first", "next")
+                ):
+                    # Same choice as repository._read_in_sort_order
+                    if not in_sort_order and ("author" in kwargs or sort in ranged or not ranged):
+                        continue
+                    after = encode_cursor(sort, CURSOR_VALUES[sort]) if page == "next" else None
+                    read = "sorted" if in_sort_order else "ranges"
+                    prefix = f"filters={label:30} sort={sort:15} read={read:6} page={page:5}"
+                    try:
+                        statement = list_books_query(sort, 50, after, None, in_sort_order, **kwargs)
+                    except ValidationException as error:
+                        print(f"{'rejected':9} {prefix} {error.detail}")
+                        continue
+
+                    compiled = statement.compile(dialect=engine.dialect)
+                    params = tuple(compiled.params[name] for name in compiled.positiontup)
+                    rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params)
+                    plan = [row[3] for row in rows]
+
+                    status = problem(plan, sort, None if in_sort_order else ranged)
+                    failures += bool(status)
+                    print(f"{status or 'ok':9} {prefix} {' | '.join(plan)}")
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
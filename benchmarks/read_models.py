@@ -0,0 +1,106 @@
+"""
+Measure the memory per row of the representations a book can be read into.
+
+Run from the project root:
+
+    python -m benchmarks.read_models [--rows 10000] [--description-size 500]
+
+A temporary database is seeded with books whose descriptions have the given
+size. The books are then read back into each representation, and the
+memory still allocated (measured with ``tracemalloc``) once the list of
+them is built is divided by the number of rows:
+
+* ``orm`` keeps the ``Book`` instances, with their session still open;
+* ``orm+dict`` keeps the instances and the dictionaries of ``to_dict``;
+* ``row`` keeps the Core rows of ``select(Book.__table__)``;
+* ``dict`` keeps only the dictionaries of ``serialization.row_to_dict``;
+* ``record`` keeps only ``serialization.BookRecord`` instances.
+
+``container`` is the share of that memory taken by the objects themselves,
+without the values (strings, numbers, datetimes) they point to, which every
+representation needs anyway.
+"""
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import tracemalloc
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--description-size", type=int, default=500)
+    args = parser.parse_args()
+
+    # Point the application at a scratch database before importing it
+    directory = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{directory}/benchmark.db"
+
+    from sqlalchemy import insert, select
+
+    from database import SessionLocal, WriteSessionLocal, init_db
+    from models import Book
+    from serialization import BookRecord, row_to_dict
+
+    table = Book.__table__
+
+    init_db()
+    with WriteSessionLocal() as session:
+        session.execute(insert(Book), [
+            {
+                "title": f"Book {i}",
+                "author": f"Author {i % 500}",
+                "description": "x" * args.description_size,
+                "price": float(i % 100),
+                "published_year": 1900 + i % 120,
+            }
+            for i in range(args.rows)
+        ])
+        session.commit()
+
+    def orm(session):
+        return list(session.scalars(select(Book)))
+
+    def orm_dict(session):
+        books = orm(session)
+        return books, [book.to_dict() for book in books]
+
+    def rows(session):
+        return session.execute(select(table)).all()
+
+    def dicts(session):
+        return [row_to_dict(row) for row in rows(session)]
+
+    def records(session):
+        return [BookRecord(**row._mapping) for row in rows(session)]
+
+    def container_size(value) -> int:
+        if isinstance(value, tuple):
+            return sum(container_size(item) for item in value)
+        first = value[0]
+        size = sys.getsizeof(first)
+        if isinstance(first, Book):
+            size += sys.getsizeof(first.__dict__) + sys.getsizeof(first._sa_instance_state)
+        return size
+
+    for name, read in (
+        ("orm", orm), ("orm+dict", orm_dict), ("row", rows), ("dict", dicts), ("record", records)
+    ):
+        with SessionLocal() as session:
+            gc.collect()
+            tracemalloc.start()
+            kept = read(session)
+            gc.collect()
+            allocated = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            print(
+                f"{name:9} {allocated / args.rows:7.0f}B/row "
+                f"container={container_size(kept):5}B/row"
+            )
+            del kept
+
+
+if __name__ == "__main__":
+    main()
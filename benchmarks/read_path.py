@@ -0,0 +1,99 @@
+"""
+Compare the ORM and Core read paths for serializing lists of books.
+
+Run from the project root:
+
+    python -m benchmarks.read_path [--sizes 10000 1000000]
+
+For every size a temporary database is seeded with that many books, which
+are then read in chunks of 1000 and turned into dictionaries twice:
+
+* ``orm`` loads ``Book`` instances and calls ``Book.to_dict``, the way the
+  list endpoint used to;
+* ``core`` runs a ``select()`` over ``Book.__table__`` and converts each
+  row with ``serialization.row_to_dict``, as ``repository.list_books`` and
+  the export now do.
+
+The script reports the CPU time per row, and the memory allocated per row
+while one chunk is alive (measured with ``tracemalloc`` on a separate pass
+over the first chunk).
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+# Rows fetched and converted per chunk
+CHUNK_SIZE = 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 1_000_000])
+    args = parser.parse_args()
+
+    # Point the application at a scratch database before importing it
+    directory = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{directory}/benchmark.db"
+
+    from sqlalchemy import delete, insert, select
+
+    from database import SessionLocal, WriteSessionLocal, init_db
+    from models import Book
+    from serialization import row_to_dict
+
+    table = Book.__table__
+
+    def orm_chunks(session, limit: int):
+        statement = select(Book).order_by(Book.id).limit(limit)
+        for books in session.scalars(statement.execution_options(yield_per=CHUNK_SIZE)).partitions():
+            yield [book.to_dict() for book in books]
+
+    def core_chunks(session, limit: int):
+        statement = select(table).order_by(table.c.id).limit(limit)
+        for rows in session.execute(statement.execution_options(yield_per=CHUNK_SIZE)).partitions():
+            yield [row_to_dict(row) for row in rows]
+
+    init_db()
+    seeded = 0
+    for size in sorted(args.sizes):
+        with WriteSessionLocal() as session:
+            if seeded == 0:
+                session.execute(delete(Book))
+            for start in range(seeded, size, 10_000):
+                session.execute(insert(Book), [
+                    {
+                        "title": f"Book {i}",
+                        "author": f"Author {i % 500}",
+                        "description": "Lorem ipsum dolor sit amet. " * 20,
+                        "price": float(i % 100),
+                        "published_year": 1900 + i % 120,
+                    }
+                    for i in range(start, min(size, start + 10_000))
+                ])
+            session.commit()
+        seeded = size
+
+        for name, chunks in (("orm", orm_chunks), ("core", core_chunks)):
+            with SessionLocal() as session:
+                started = time.process_time()
+                for _ in chunks(session, size):
+                    pass
+                cpu = time.process_time() - started
+
+            with SessionLocal() as session:
+                tracemalloc.start()
+                chunk = next(chunks(session, CHUNK_SIZE))
+                allocated = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                del chunk
+
+            print(
+                f"rows={size:9} {name:5} cpu={cpu / size * 1_000_000:6.2f}us/row "
+                f"allocated={allocated / CHUNK_SIZE:7.0f}B/row"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Measure the CPU time saved by reusing the single-book statements.
+
+Run from the project root:
+
+    python -m benchmarks.statement_cache [--books 10000] [--calls 5000]
+
+Compares, for get, update and delete, the statements built on every call
+(as the repository used to) with the prebuilt statements of
+``repository.py``. Every call runs in a fresh session, like a request, on a
+temporary database, and the script reports the CPU time per call measured
+with ``time.process_time``.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--books", type=int, default=10_000)
+    parser.add_argument("--calls", type=int, default=5_000)
+    args = parser.parse_args()
+
+    # Point the application at a scratch database before importing it
+    directory = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{directory}/benchmark.db"
+
+    from sqlalchemy import delete, insert, update
+
+    import repository
+    from database import SessionLocal, WriteSessionLocal, init_db, write_engine
+    from models import Book
+    from search import rebuild_search_index, unindex_books
+
+    table = Book.__table__
+
+    def built_get(session, book_id: int):
+        return session.query(Book).filter(Book.id == book_id).first()
+
+    def built_update(session, book_id: int, data: dict):
+        statement = update(table).where(table.c.id == book_id).values(**data).returning(*table.c)
+        row = session.execute(statement).first()
+        session.commit()
+        return row
+
+    def built_delete(session, book_id: int):
+        statement = delete(table).where(table.c.id == book_id).returning(table.c.id)
+        deleted = session.execute(statement).first()
+        if deleted is not None:
+            unindex_books(session, [book_id])
+        session.commit()
+        return deleted is not None
+
+    init_db()
+    with WriteSessionLocal() as session:
+        session.execute(insert(Book), [
+            {"title": f"Book {i}", "author": f"Author {i % 500}", "price": 10.0}
+            for i in range(args.books)
+        ])
+        session.commit()
+    # Rows inserted directly are not indexed for search yet
+    rebuild_search_index(write_engine)
+
+    random.seed(0)
+    book_ids = [random.randint(1, args.books) for _ in range(args.calls)]
+    # Each variant deletes its own, distinct half of the books
+    halves = {"built": range(1, args.books // 2 + 1), "cached": range(args.books // 2 + 1, args.books + 1)}
+
+    def measure(name: str, factory, function, calls) -> None:
+        started = time.process_time()
+        for call in calls:
+            with factory() as session:
+                function(session, *call)
+        elapsed = time.process_time() - started
+        print(f"{name:14} cpu={elapsed / len(calls) * 1_000_000:7.1f}us/call")
+
+    for variant, get, update_, delete_ in (
+        ("built", built_get, built_update, built_delete),
+        ("cached", repository.get_book, repository.update_book, repository.delete_book),
+    ):
+        measure(f"{variant} get", SessionLocal, get, [(book_id,) for book_id in book_ids])
+        measure(
+            f"{variant} update",
+            WriteSessionLocal,
+            update_,
+            [(book_id, {"price": float(i)}) for i, book_id in enumerate(book_ids)]
+        )
+        deletes = list(halves[variant])[:args.calls]
+        measure(f"{variant} delete", WriteSessionLocal, delete_, [(book_id,) for book_id in deletes])
+
+
+if __name__ == "__main__":
+    main()
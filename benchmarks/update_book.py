@@ -0,0 +1,82 @@
+"""
+Microbenchmark of the single-book update path.
+
+Run from the project root:
+
+    python -m benchmarks.update_book [--books 10000] [--updates 2000]
+
+Compares the ORM update (SELECT, UPDATE on commit, then a refresh SELECT)
+with ``repository.update_book``, which issues one ``UPDATE ... RETURNING``
+and, since the title changes, replaces the book's full-text index entry.
+Both run on the write engine against a temporary database, and the
+script reports the statements executed and the latency per update.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--books", type=int, default=10_000)
+    parser.add_argument("--updates", type=int, default=2_000)
+    args = parser.parse_args()
+
+    # Point the application at a scratch database before importing it
+    directory = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{directory}/benchmark.db"
+
+    from sqlalchemy import event, insert
+
+    import repository
+    from database import WriteSessionLocal, init_db, write_engine
+    from models import Book
+    from search import index_books, rebuild_search_index, unindex_books
+
+    def orm_update(session, book_id: int, data: dict):
+        """The update path before UPDATE ... RETURNING."""
+        book = session.query(Book).filter(Book.id == book_id).first()
+        if not book:
+            return None
+        for name, value in data.items():
+            setattr(book, name, value)
+        unindex_books(session, [book_id])
+        index_books(session, [book_id])
+        session.commit()
+        session.refresh(book)
+        return book
+
+    init_db()
+    with WriteSessionLocal() as session:
+        session.execute(insert(Book), [
+            {"title": f"Book {i}", "author": f"Author {i % 500}", "price": 10.0}
+            for i in range(args.books)
+        ])
+        session.commit()
+    # Rows inserted directly are not indexed for search yet
+    rebuild_search_index(write_engine)
+
+    statements = []
+    event.listen(write_engine, "before_cursor_execute", lambda *_: statements.append(1))
+
+    random.seed(0)
+    book_ids = [random.randint(1, args.books) for _ in range(args.updates)]
+
+    for name, function in (("orm", orm_update), ("returning", repository.update_book)):
+        statements.clear()
+        started = time.perf_counter()
+        for i, book_id in enumerate(book_ids):
+            with WriteSessionLocal() as session:
+                function(session, book_id, {"price": float(i), "title": f"Book {book_id}*"})
+        elapsed = time.perf_counter() - started
+        print(
+            f"{name:10} statements/update={len(statements) / args.updates:4.1f} "
+            f"latency={elapsed / args.updates * 1_000_000:8.1f}us "
+            f"throughput={args.updates / elapsed:8.0f} updates/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
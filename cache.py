@@ -0,0 +1,139 @@
+"""
+In-process caching for the Litestar and SQLAlchemy application.
+
+This module provides a bounded LRU cache with a time-to-live, used in front
+of ``GET /books/{book_id}`` so that reads of hot books never reach SQLite,
+and a second one for the JSON fragments ``GET /books`` assembles its pages
+from. The list is kept apart so that paging through the catalog neither
+evicts the hot books nor counts towards their hit ratio. Write handlers
+invalidate the affected entries of both with :func:`invalidate_book`.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+# Maximum number of books kept in the cache
+BOOK_CACHE_SIZE = 10_000
+
+# Seconds after which a cached book is reloaded from the database
+BOOK_CACHE_TTL = 300.0
+
+# Maximum number of books whose list fragments are kept
+FRAGMENT_CACHE_SIZE = 10_000
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache whose entries also expire after a fixed TTL.
+
+    Readers that miss should take a :meth:`token` before querying the
+    database and pass it to :meth:`put`. If any entry was invalidated in
+    the meantime the value may already be stale, and it is not stored.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable, accept: Optional[Callable[[Any], bool]] = None) -> Optional[Any]:
+        """
+        Return the cached value for ``key``, or None on a miss.
+
+        Args:
+            key: The cache key.
+            accept: Tells whether a cached value can serve this lookup. A
+                value it rejects counts as a miss and is not promoted.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            if accept is not None and not accept(value):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def token(self) -> int:
+        """Return a token identifying the current invalidation generation."""
+        return self._generation
+
+    def put(self, key: Hashable, value: Any, token: Optional[int] = None) -> None:
+        """
+        Store a value, evicting the least recently used entry when full.
+
+        Args:
+            key: The cache key.
+            value: The value to store.
+            token: Result of :meth:`token` taken before the value was read.
+                The value is dropped if an invalidation happened since.
+        """
+        with self._lock:
+            if token is not None and token != self._generation:
+                return
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        """Remove ``key`` from the cache."""
+        with self._lock:
+            self._generation += 1
+            if self._entries.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        """Remove every entry from the cache."""
+        with self._lock:
+            self._generation += 1
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Return the cache configuration and counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+# Encoded books (see serialization.EncodedBook) keyed by ID, shared by all
+# requests in this process. Only complete books read by ID are stored.
+book_cache = LRUCache(max_size=BOOK_CACHE_SIZE, ttl=BOOK_CACHE_TTL)
+
+# Encoded books keyed by ID, as read by the book list
+fragment_cache = LRUCache(max_size=FRAGMENT_CACHE_SIZE, ttl=BOOK_CACHE_TTL)
+
+
+def invalidate_book(book_id: int) -> None:
+    """Remove a book from both caches after it was written."""
+    book_cache.invalidate(book_id)
+    fragment_cache.invalidate(book_id)
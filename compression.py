@@ -0,0 +1,215 @@
+"""
+Compression of long text columns for the Litestar and SQLAlchemy application.
+
+``CompressedText`` is a column type that stores values longer than
+``COMPRESSION_THRESHOLD`` bytes as zlib-compressed blobs and returns them as
+text again, so the rest of the application never sees the difference.
+Descriptions are short and similar to each other, which compresses poorly
+one at a time; each blob is therefore compressed against a preset
+dictionary of phrases that are common across the catalog.
+
+Dictionaries are trained from existing rows by ``recompress.py`` and kept
+in the ``compression_dictionaries`` table. A blob records the ID of the
+dictionary it was compressed with, so training a new one never makes older
+blobs unreadable.
+"""
+import os
+import re
+import struct
+import zlib
+from collections import Counter
+from typing import Callable, Dict, Iterable, Optional, Union
+
+from sqlalchemy.types import Text, TypeDecorator
+
+# Values whose UTF-8 encoding is at least this long are compressed
+COMPRESSION_THRESHOLD = int(os.environ.get("DB_COMPRESS_THRESHOLD", "256"))
+
+# zlib level used for new blobs; descriptions are read far more than written
+COMPRESSION_LEVEL = 9
+
+# A preset dictionary is only useful up to the size of the deflate window
+DICTIONARY_SIZE = 32 * 1024
+
+# Name of the SQL function that returns the text of a stored value, used
+# when indexing books for full-text search, which needs text rather than
+# blobs. The application registers it on its own connections.
+DECOMPRESS_FUNCTION = "decompress_text"
+
+# Every blob starts with the ID of its dictionary, 0 for none
+_HEADER = struct.Struct(">H")
+
+# Longest phrase, in words, considered for a dictionary
+_MAX_PHRASE_WORDS = 4
+
+_WORDS = re.compile(r"\S+")
+
+
+class DictionaryRegistry:
+    """
+    The compression dictionaries known to this process.
+
+    Blobs are compressed with the current dictionary. A blob written with a
+    dictionary trained after this process loaded the table is decoded by
+    fetching that dictionary through ``loader`` the first time it is seen.
+    """
+
+    def __init__(self) -> None:
+        self.dictionaries: Dict[int, bytes] = {}
+        self.current: Optional[int] = None
+        self.loader: Optional[Callable[[int], Optional[bytes]]] = None
+
+    def add(self, dictionary_id: int, data: bytes) -> None:
+        """Register a dictionary and make it current if it is the newest."""
+        self.dictionaries[dictionary_id] = data
+        if self.current is None or dictionary_id > self.current:
+            self.current = dictionary_id
+
+    def get(self, dictionary_id: int) -> bytes:
+        """
+        Return a dictionary by ID.
+
+        Raises:
+            LookupError: If the dictionary is neither registered nor found
+                by the loader.
+        """
+        data = self.dictionaries.get(dictionary_id)
+        if data is None and self.loader is not None:
+            data = self.loader(dictionary_id)
+            if data is not None:
+                self.add(dictionary_id, data)
+        if data is None:
+            raise LookupError(f"Unknown compression dictionary {dictionary_id}")
+        return data
+
+
+dictionaries = DictionaryRegistry()
+
+
+def compress(text: str) -> Union[str, bytes]:
+    """
+    Encode a value for storage.
+
+    Args:
+        text: The value to store.
+
+    Returns:
+        A blob holding the compressed value, or the value itself when it is
+        below the threshold or does not get any smaller.
+    """
+    raw = text.encode("utf-8")
+    if len(raw) < COMPRESSION_THRESHOLD:
+        return text
+    dictionary_id = dictionaries.current or 0
+    if dictionary_id:
+        compressor = zlib.compressobj(
+            COMPRESSION_LEVEL, wbits=-15, zdict=dictionaries.get(dictionary_id)
+        )
+    else:
+        compressor = zlib.compressobj(COMPRESSION_LEVEL, wbits=-15)
+    blob = _HEADER.pack(dictionary_id) + compressor.compress(raw) + compressor.flush()
+    return blob if len(blob) < len(raw) else text
+
+
+def decompress(value: Union[str, bytes, None]) -> Optional[str]:
+    """
+    Decode a stored value.
+
+    Args:
+        value: A value as read from the database, text or a blob.
+
+    Returns:
+        The original text.
+    """
+    if not isinstance(value, bytes):
+        return value
+    (dictionary_id,) = _HEADER.unpack_from(value)
+    if dictionary_id:
+        decompressor = zlib.decompressobj(wbits=-15, zdict=dictionaries.get(dictionary_id))
+    else:
+        decompressor = zlib.decompressobj(wbits=-15)
+    return (decompressor.decompress(value[_HEADER.size:]) + decompressor.flush()).decode("utf-8")
+
+
+def dictionary_id(value: Union[str, bytes, None]) -> Optional[int]:
+    """
+    Return the ID of the dictionary a stored value was compressed with.
+
+    Args:
+        value: A value as read from the database.
+
+    Returns:
+        The dictionary ID, 0 for a blob compressed without one, or None when
+        the value is not compressed.
+    """
+    if not isinstance(value, bytes):
+        return None
+    return _HEADER.unpack_from(value)[0]
+
+
+def train_dictionary(samples: Iterable[str], size: int = DICTIONARY_SIZE) -> bytes:
+    """
+    Build a preset dictionary from sample values.
+
+    zlib has no trainer of its own: a preset dictionary is simply text the
+    compressor may refer back to. The phrases of up to four words that
+    occur in the most samples are ranked by the bytes they would save, and
+    the best ones are concatenated with the most valuable last, since the
+    end of the dictionary is the cheapest to refer to.
+
+    Args:
+        samples: Values representative of what will be compressed.
+        size: Maximum size of the dictionary in bytes.
+
+    Returns:
+        The dictionary.
+    """
+    counts: Counter = Counter()
+    for sample in samples:
+        words = _WORDS.findall(sample)
+        phrases = set()
+        for length in range(1, _MAX_PHRASE_WORDS + 1):
+            for start in range(len(words) - length + 1):
+                phrases.add(" ".join(words[start:start + length]))
+        counts.update(phrases)
+
+    # A phrase seen in a single sample is not shared and only wastes space
+    ranked = sorted(
+        (phrase for phrase, count in counts.items() if count > 1),
+        key=lambda phrase: counts[phrase] * len(phrase),
+        reverse=True
+    )
+    chosen = []
+    used = 0
+    for phrase in ranked:
+        encoded = phrase.encode("utf-8") + b" "
+        if used + len(encoded) > size:
+            break
+        chosen.append(encoded)
+        used += len(encoded)
+    return b"".join(reversed(chosen))
+
+
+class CompressedText(TypeDecorator):
+    """
+    Text column that is compressed at rest.
+
+    Values are compressed by :func:`compress` when written and decompressed
+    when read, including in Core statements and ``RETURNING`` rows, since
+    the conversion is part of the column's type. SQL expressions that read
+    the column directly, such as ``LIKE``, see the blob; use the
+    ``decompress_text()`` SQL function there.
+    """
+
+    impl = Text
+    cache_ok = True
+
+    @property
+    def python_type(self) -> type:
+        return str
+
+    def process_bind_param(self, value: Optional[str], dialect) -> Union[str, bytes, None]:
+        return None if value is None else compress(value)
+
+    def process_result_value(self, value: Union[str, bytes, None], dialect) -> Optional[str]:
+        return decompress(value)
@@ -3,17 +3,44 @@ Controllers for the Litestar application.
 
 This module defines controller classes that handle HTTP requests and responses.
 """
-from typing import List, Optional
+from typing import Any, List, Optional
 
-from litestar import Controller, get, post, put, delete, Router
+from litestar import Controller, Response, get, patch, post, put, delete, Router
 from litestar.di import Provide
 from litestar.params import Parameter, Body
-from litestar.exceptions import NotFoundException
-from sqlalchemy.orm import Session
+from litestar.exceptions import NotFoundException, ValidationException
+from litestar.response import Stream
 from litestar.status_codes import HTTP_200_OK
+from litestar.enums import MediaType
 
-from database import get_db_session
+from cache import book_cache, fragment_cache, invalidate_book
+import repository
+from database import (
+    Database,
+    async_pool_metrics,
+    database_settings,
+    get_db,
+    group_committer,
+    read_executor,
+    read_pool_metrics,
+    write_executor,
+    write_pool_metrics
+)
+from dto import book_dto
+from fieldsets import (
+    DEFERRED_FIELDS,
+    SUMMARY_FIELDS,
+    collection_fields,
+    parse_fields,
+    parse_include
+)
 from models import Book
+from pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER
+from schemas import BookCreate, BookUpdate, struct_values
+from search import search_books
+from serialization import book_json, book_summary_json, encode_book, json_array, row_to_dict
+from streaming import iter_books_json
+from validation import validate_book_data, validate_selection
 
 
 class BookController(Controller):
@@ -21,125 +48,376 @@ class BookController(Controller):
     Controller for book-related routes.
     
     Demonstrates Litestar's class-based routing with dependency injection.
+    Handlers receive a database and run the data access functions from
+    ``repository`` through it, so queries never block the event loop.
     """
     path = "/books"
-    dependencies = {"db_session": Provide(get_db_session)}
+    dependencies = {"db": Provide(get_db)}
     
     @get("/")
-    async def get_books(self, db_session: Session) -> List[dict]:
+    async def get_books(
+        self,
+        db: Database,
+        limit: int = Parameter(
+            default=DEFAULT_PAGE_SIZE,
+            ge=1,
+            le=MAX_PAGE_SIZE,
+            description="Maximum number of books to return"
+        ),
+        after: Optional[str] = Parameter(
+            default=None,
+            description=f"Cursor from the {NEXT_CURSOR_HEADER} header of the previous page"
+        ),
+        sort: str = Parameter(
+            default="id",
+            description="Sort key (id, title, author, published_year or price), "
+                        "prefix with '-' for descending"
+        ),
+        author: Optional[str] = Parameter(default=None, description="Only books by this author"),
+        title_prefix: Optional[str] = Parameter(
+            default=None,
+            description="Only books whose title starts with this text"
+        ),
+        min_year: Optional[int] = Parameter(default=None, description="Earliest publication year"),
+        max_year: Optional[int] = Parameter(default=None, description="Latest publication year"),
+        min_price: Optional[float] = Parameter(default=None, description="Lowest price"),
+        max_price: Optional[float] = Parameter(default=None, description="Highest price"),
+        fields: Optional[str] = Parameter(
+            default=None,
+            description="Comma separated list of fields to return, e.g. id,title,author"
+        ),
+        include: Optional[str] = Parameter(
+            default=None,
+            description="Comma separated list of fields left out of the list by default "
+                        f"to return too: {', '.join(DEFERRED_FIELDS)}"
+        )
+    ) -> Response[List[dict]]:
         """
-        Get all books from the database.
+        Get a page of books from the database.
+        
+        Uses keyset pagination: the cursor for the next page is returned in
+        the X-Next-Cursor header and passed back through the ``after`` parameter.
+        
+        The description is only read and returned when asked for with
+        ``include=description`` or by name in ``fields``.
+        
+        Args:
+            limit: Maximum number of books to return.
+            after: Cursor of the previous page.
+            sort: Sort expression.
+            author: Exact author to filter by.
+            title_prefix: Title prefix to filter by.
+            min_year: Lower bound of the publication year.
+            max_year: Upper bound of the publication year.
+            min_price: Lower bound of the price.
+            max_price: Upper bound of the price.
+            fields: Fields to include in each book.
+            include: Fields left out of the list by default to return too.
+            db: Database to run the queries on.
         
         Returns:
-            A list of books as dictionaries.
+            A JSON array of books.
         """
-        books = db_session.query(Book).all()
-        return [book.to_dict() for book in books]
+        selected = collection_fields(parse_fields(fields), parse_include(include))
+        token = fragment_cache.token()
+        
+        page = await db.read(
+            repository.list_books,
+            sort=sort,
+            limit=limit,
+            after=after,
+            fields=selected,
+            author=author,
+            title_prefix=title_prefix,
+            min_year=min_year,
+            max_year=max_year,
+            min_price=min_price,
+            max_price=max_price
+        )
+        
+        headers = {}
+        if page.next_cursor:
+            headers[NEXT_CURSOR_HEADER] = page.next_cursor
+        
+        # Assemble the default list and the complete one from the cached
+        # JSON of each book
+        if selected is None:
+            content = json_array(book_json(row, token) for row in page.items)
+        elif tuple(selected) == SUMMARY_FIELDS:
+            content = json_array(book_summary_json(row, token) for row in page.items)
+        else:
+            return Response([row_to_dict(row, selected) for row in page.items], headers=headers)
+        return Response(content, headers=headers, media_type=MediaType.JSON)
+    
+    @get("/search")
+    async def search(
+        self,
+        db: Database,
+        q: str = Parameter(description="Text to search for in title, author and description"),
+        limit: int = Parameter(
+            default=DEFAULT_PAGE_SIZE,
+            ge=1,
+            le=MAX_PAGE_SIZE,
+            description="Maximum number of results to return"
+        )
+    ) -> List[dict]:
+        """
+        Full-text search over books, ranked with BM25.
+        
+        Args:
+            q: Search terms; all of them must match. End a term with ``*``
+                for a prefix search.
+            limit: Maximum number of results to return.
+            db: Database to run the queries on.
+        
+        Returns:
+            Matching books, best match first, with highlighted snippets.
+        """
+        return await db.read(search_books, q, limit)
+    
+    @get("/export")
+    async def export_books(self) -> Stream:
+        """
+        Stream every book in the database as a single JSON array.
+        
+        The array is encoded and sent a chunk at a time, so memory use does
+        not grow with the size of the catalog.
+        
+        Returns:
+            A streaming response with the same shape as the book list with
+            ``include=description``.
+        """
+        return Stream(iter_books_json(), media_type=MediaType.JSON)
     
     @get("/{book_id:int}")
     async def get_book(
         self, 
-        db_session: Session, 
-        book_id: int = Parameter(description="The ID of the book to retrieve")
-    ) -> dict:
+        db: Database, 
+        book_id: int = Parameter(description="The ID of the book to retrieve"),
+        fields: Optional[str] = Parameter(
+            default=None,
+            description="Comma separated list of fields to return, e.g. id,title,author"
+        )
+    ) -> Response[dict]:
         """
         Get a book by ID.
         
         Args:
             book_id: The ID of the book to retrieve.
-            db_session: SQLAlchemy database session.
+            fields: Fields to include in the book.
+            db: Database to run the queries on.
             
         Returns:
-            The book as a dictionary.
+            The book as a JSON object.
             
         Raises:
             NotFoundException: If the book is not found.
         """
-        book = db_session.query(Book).filter(Book.id == book_id).first()
+        selected = parse_fields(fields)
+        
+        # Serve hot books from the in-process cache without touching SQLite
+        cached = book_cache.get(book_id)
+        if cached is not None:
+            if selected is None:
+                return Response(cached.json, media_type=MediaType.JSON)
+            return Response({name: cached.data[name] for name in selected})
+        
+        token = book_cache.token()
+        book = await db.read(repository.get_book, book_id, selected)
         if not book:
             raise NotFoundException(f"Book with ID {book_id} not found")
-        return book.to_dict()
+        
+        # Only complete books are cached; projections are served from them
+        if selected is None:
+            encoded = encode_book(book)
+            book_cache.put(book_id, encoded, token)
+            return Response(encoded.json, media_type=MediaType.JSON)
+        return Response(book.to_dict(selected))
     
-    @post("/")
+    @post("/", return_dto=book_dto())
     async def create_book(
         self, 
-        db_session: Session, 
-        data: dict = Body(description="Book data to create")
-    ) -> dict:
+        db: Database, 
+        data: BookCreate = Body(description="Book data to create")
+    ) -> Book:
         """
         Create a new book.
         
         Args:
-            data: Book data from request body.
-            db_session: SQLAlchemy database session.
+            data: Book data from request body, already validated.
+            db: Database to run the queries on.
             
         Returns:
-            The created book as a dictionary.
-        """
-        # Create a new book from the request data
-        book = Book(
-            title=data["title"],
-            author=data["author"],
-            description=data.get("description"),
-            price=data.get("price"),
-            published_year=data.get("published_year")
-        )
+            The created book.
+        """
+        book = await db.write_grouped(repository.create_book, struct_values(data))
         
-        # Add and commit to the database
-        db_session.add(book)
-        db_session.commit()
-        db_session.refresh(book)
+        # SQLite may reuse the ID of a deleted book, so drop any stale entry
+        invalidate_book(book.id)
         
-        return book.to_dict()
+        return book
     
-    @put("/{book_id:int}")
+    @post("/bulk")
+    async def create_books_bulk(
+        self,
+        db: Database,
+        data: List[Any] = Body(description="List of books to create")
+    ) -> dict:
+        """
+        Create many books in one request.
+        
+        Items are validated one by one and the valid ones are inserted in
+        chunked transactions. Invalid items are reported without aborting
+        the rest of the batch.
+        
+        Args:
+            data: The books to create.
+            db: Database to run the queries on.
+        
+        Returns:
+            The IDs of the created books and the errors of the rejected
+            ones, each tagged with the item's index in the request.
+        
+        Raises:
+            ValidationException: If the request has too many items.
+        """
+        if len(data) > repository.BULK_MAX_ITEMS:
+            raise ValidationException(
+                f"At most {repository.BULK_MAX_ITEMS} books can be created per request"
+            )
+        
+        valid, errors = [], []
+        for index, item in enumerate(data):
+            try:
+                valid.append((index, validate_book_data(item)))
+            except ValueError as error:
+                errors.append({"index": index, "error": str(error)})
+        
+        created, failed = await db.write(repository.bulk_create_books, valid)
+        
+        # SQLite may reuse the IDs of deleted books, so drop any stale entries
+        for item in created:
+            invalidate_book(item["id"])
+        
+        errors.extend(failed)
+        errors.sort(key=lambda error: error["index"])
+        return {"created": created, "errors": errors}
+    
+    @patch("/bulk")
+    async def update_books_bulk(
+        self,
+        db: Database,
+        data: dict = Body(description="Books to update and the values to set")
+    ) -> dict:
+        """
+        Set the same values on many books.
+        
+        The body holds ``values``, the fields to set, and either ``ids``, a
+        list of book IDs, or ``filter``, collection filters such as
+        ``{"author": "...", "max_year": 1950}``. The update runs as chunked
+        ``UPDATE ... WHERE id IN (...)`` statements.
+        
+        Args:
+            data: The selection and the values to set.
+            db: Database to run the queries on.
+        
+        Returns:
+            The number of updated books and, for an ID list, the IDs that
+            were not found.
+        
+        Raises:
+            ValidationException: If the body is invalid.
+        """
+        try:
+            ids, filters = validate_selection(data, repository.BULK_MAX_IDS)
+            values = validate_book_data(data.get("values"), partial=True)
+        except ValueError as error:
+            raise ValidationException(str(error))
+        if not values:
+            raise ValidationException("'values' must set at least one field")
+        
+        updated = await db.write(repository.bulk_update_books, values, ids, filters)
+        for book_id in updated:
+            invalidate_book(book_id)
+        
+        return self._bulk_result("updated", updated, ids)
+    
+    @delete("/bulk", status_code=HTTP_200_OK)
+    async def delete_books_bulk(
+        self,
+        db: Database,
+        data: dict = Body(description="Books to delete")
+    ) -> dict:
+        """
+        Delete many books.
+        
+        The body holds either ``ids``, a list of book IDs, or ``filter``,
+        collection filters such as ``{"author": "..."}``. The deletion runs
+        as chunked ``DELETE ... WHERE id IN (...)`` statements.
+        
+        Args:
+            data: The selection of books to delete.
+            db: Database to run the queries on.
+        
+        Returns:
+            The number of deleted books and, for an ID list, the IDs that
+            were not found.
+        
+        Raises:
+            ValidationException: If the body is invalid.
+        """
+        try:
+            ids, filters = validate_selection(data, repository.BULK_MAX_IDS)
+        except ValueError as error:
+            raise ValidationException(str(error))
+        
+        deleted = await db.write(repository.bulk_delete_books, ids, filters)
+        for book_id in deleted:
+            invalidate_book(book_id)
+        
+        return self._bulk_result("deleted", deleted, ids)
+    
+    @staticmethod
+    def _bulk_result(action: str, affected: List[int], ids: Optional[List[int]]) -> dict:
+        """Build the response of a bulk update or delete."""
+        result = {action: len(affected)}
+        if ids is not None:
+            found = set(affected)
+            result["not_found"] = sorted({book_id for book_id in ids if book_id not in found})
+        return result
+    
+    @put("/{book_id:int}", return_dto=book_dto())
     async def update_book(
         self, 
-        db_session: Session, 
-        data: dict = Body(description="Book data to update"),
+        db: Database, 
+        data: BookUpdate = Body(description="Book data to update"),
         book_id: int = Parameter(description="The ID of the book to update")
-    ) -> dict:
+    ) -> Book:
         """
         Update an existing book.
         
         Args:
             book_id: The ID of the book to update.
-            data: Updated book data.
-            db_session: SQLAlchemy database session.
+            data: Updated book data, already validated.
+            db: Database to run the queries on.
             
         Returns:
-            The updated book as a dictionary.
+            The updated book.
             
         Raises:
             NotFoundException: If the book is not found.
         """
-        # Find the book to update
-        book = db_session.query(Book).filter(Book.id == book_id).first()
+        book = await db.write_grouped(repository.update_book, book_id, struct_values(data))
         if not book:
             raise NotFoundException(f"Book with ID {book_id} not found")
+        invalidate_book(book_id)
         
-        # Update the book attributes
-        if "title" in data:
-            book.title = data["title"]
-        if "author" in data:
-            book.author = data["author"]
-        if "description" in data:
-            book.description = data["description"]
-        if "price" in data:
-            book.price = data["price"]
-        if "published_year" in data:
-            book.published_year = data["published_year"]
-        
-        # Commit the changes
-        db_session.commit()
-        db_session.refresh(book)
-        
-        return book.to_dict()
+        return book
     
     @delete("/{book_id:int}", status_code=HTTP_200_OK)
     async def delete_book(
         self, 
-        db_session: Session, 
+        db: Database, 
         book_id: int = Parameter(description="The ID of the book to delete")
     ) -> dict:
         """
@@ -147,7 +425,7 @@ class BookController(Controller):
         
         Args:
             book_id: The ID of the book to delete.
-            db_session: SQLAlchemy database session.
+            db: Database to run the queries on.
             
         Returns:
             A message confirming deletion.
@@ -155,13 +433,78 @@ class BookController(Controller):
         Raises:
             NotFoundException: If the book is not found.
         """
-        # Find the book to delete
-        book = db_session.query(Book).filter(Book.id == book_id).first()
-        if not book:
+        deleted = await db.write_grouped(repository.delete_book, book_id)
+        if not deleted:
             raise NotFoundException(f"Book with ID {book_id} not found")
+        invalidate_book(book_id)
         
-        # Delete the book
-        db_session.delete(book)
-        db_session.commit()
+        return {"message": f"Book with ID {book_id} deleted successfully"}
+
+
+class AdminController(Controller):
+    """
+    Controller for operational endpoints.
+    
+    Exposes internal metrics of the running process.
+    """
+    path = "/admin"
+    
+    @get("/cache")
+    async def cache_stats(self) -> dict:
+        """
+        Get the configuration and counters of the book cache.
+        
+        Returns:
+            Cache size, hit/miss/eviction counters and the hit ratio, with
+            the same figures for the list's fragment cache under ``fragments``.
+        """
+        return {**book_cache.stats(), "fragments": fragment_cache.stats()}
+    
+    @get("/executors")
+    async def executor_stats(self) -> List[dict]:
+        """
+        Get the queue depth and wait times of the database threads.
+        
+        The read pool is only used when DB_EXECUTION is "threaded"; the
+        write queue holds every write waiting for the writer thread.
+        
+        Returns:
+            Statistics for the read pool and the writer thread.
+        """
+        return [read_executor.stats(), write_executor.stats()]
+    
+    @get("/group-commit")
+    async def group_commit_stats(self) -> dict:
+        """
+        Get the batch statistics of the group commit stage.
         
-        return {"message": f"Book with ID {book_id} deleted successfully"}
\ No newline at end of file
+        Returns:
+            Window, batch size limit and batch counters, or only
+            ``{"enabled": false}`` when DB_GROUP_COMMIT is "off".
+        """
+        if group_committer is None:
+            return {"enabled": False}
+        return {"enabled": True, **group_committer.stats()}
+    
+    @get("/database")
+    async def database_stats(self) -> dict:
+        """
+        Get the SQLite settings in effect and the WAL checkpoint statistics.
+        
+        Returns:
+            The DB_PROFILE name, the pragmas of the write and read
+            connections and the checkpoint counters.
+        """
+        return await database_settings()
+    
+    @get("/pools")
+    async def pool_stats(self) -> List[dict]:
+        """
+        Get the connection pool metrics of the database engines.
+        
+        Returns:
+            Checkout counters, connection churn and checkout wait time
+            histograms for the async and threaded read pools and the
+            write connection.
+        """
+        return [async_pool_metrics.stats(), read_pool_metrics.stats(), write_pool_metrics.stats()]
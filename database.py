@@ -1,24 +1,218 @@
 """
 Database configuration for the Litestar and SQLAlchemy application.
 
-This module sets up the SQLAlchemy engine, session, and base model.
+This module sets up the SQLAlchemy engines, sessions, and base model.
 """
-from sqlalchemy import create_engine
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Callable, List, Optional, Tuple, TypeVar
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, scoped_session
+from sqlalchemy.orm import Session, sessionmaker, scoped_session
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool, StaticPool
+
+from compression import DECOMPRESS_FUNCTION, decompress, dictionaries
+from executors import InstrumentedExecutor
+from group_commit import GroupCommitter, Operation, run_batch
+from pool_metrics import PoolMetrics
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
 
 # SQLite database URL - using SQLite for simplicity
 # In a production environment, you would use a more robust database
-DATABASE_URL = "sqlite:///./app.db"
+DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///./app.db")
+
+# The same database accessed through the aiosqlite driver, used by the
+# request handlers so that queries do not block the event loop
+ASYNC_DATABASE_URL = DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1)
+
+# How handlers run their reads: "async" uses the aiosqlite engine,
+# "threaded" runs the synchronous engine in a dedicated thread pool.
+# Writes always go to the single writer thread (see write_engine below).
+DB_EXECUTION = os.environ.get("DB_EXECUTION", "async")
+
+# Size of the read thread pool used by the "threaded" mode
+DB_READ_THREADS = int(os.environ.get("DB_READ_THREADS", "4"))
+
+# Connection pools of the read engines: connections kept open, extra
+# connections allowed under load, seconds to wait for a free connection
+# before failing, and whether to test a connection before handing it out
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "30"))
+DB_POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "off") == "on"
+
+# SQLite settings applied to every connection, by profile. With the WAL
+# journal readers work from a snapshot while a write is in progress, so long
+# scans and exports never block the writer (nor it them), also across
+# worker processes; with the rollback journal ("DELETE") a commit waits for
+# readers to finish. Negative cache sizes are in KiB, mmap sizes in bytes.
+PRAGMA_PROFILES = {
+    # SQLite's own defaults
+    "sqlite": {
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+        "cache_size": -2_000,
+        "mmap_size": 0,
+        "temp_store": "DEFAULT",
+        "busy_timeout": 5_000,
+    },
+    # WAL, with every commit synced to disk before it returns
+    "durable": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "cache_size": -64_000,
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "busy_timeout": 5_000,
+    },
+    # WAL, syncing only at checkpoints: a power loss can undo the last
+    # commits but never corrupts the database
+    "balanced": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -64_000,
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "busy_timeout": 5_000,
+    },
+    # No syncing at all: an OS crash or power loss can corrupt the database
+    "fast": {
+        "journal_mode": "WAL",
+        "synchronous": "OFF",
+        "cache_size": -256_000,
+        "mmap_size": 1024 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "busy_timeout": 5_000,
+    },
+}
+DB_PROFILE = os.environ.get("DB_PROFILE", "balanced")
+
+# Pragmas that apply to a single connection. journal_mode is a property of
+# the database file, so only the write connection sets it.
+CONNECTION_PRAGMAS = ("synchronous", "cache_size", "mmap_size", "temp_store", "busy_timeout")
+
+# Seconds between WAL checkpoints run by the writer thread (0 disables them).
+# SQLite also checkpoints on its own, but only at the end of a commit that
+# finds the log large enough and without waiting for readers, so a busy
+# read load can keep the log growing.
+DB_CHECKPOINT_INTERVAL = float(os.environ.get("DB_CHECKPOINT_INTERVAL", "60"))
+
+# Group commit for single-book writes: writes arriving within the window
+# (in milliseconds) share one transaction, up to DB_GROUP_COMMIT_MAX of them.
+# Set DB_GROUP_COMMIT to "off" to give every write its own transaction.
+DB_GROUP_COMMIT = os.environ.get("DB_GROUP_COMMIT", "on") != "off"
+DB_GROUP_COMMIT_WINDOW_MS = float(os.environ.get("DB_GROUP_COMMIT_WINDOW_MS", "2"))
+DB_GROUP_COMMIT_MAX = int(os.environ.get("DB_GROUP_COMMIT_MAX", "64"))
+
+# Checkout, churn and wait time metrics of each engine's pool
+read_pool_metrics = PoolMetrics("read")
+async_pool_metrics = PoolMetrics("async")
+write_pool_metrics = PoolMetrics("write")
+
+# Pool settings shared by the read engines
+POOL_OPTIONS = {
+    "pool_size": DB_POOL_SIZE,
+    "max_overflow": DB_MAX_OVERFLOW,
+    "pool_timeout": DB_POOL_TIMEOUT,
+    "pool_pre_ping": DB_POOL_PRE_PING,
+}
 
-# Create SQLAlchemy engine
+# Create the SQLAlchemy engine for reads in the "threaded" mode. Like the
+# async engine, its connections are read-only (see
+# _configure_read_connection).
 engine = create_engine(
     DATABASE_URL, 
-    connect_args={"check_same_thread": False}  # Needed for SQLite
+    poolclass=read_pool_metrics.pool_class(QueuePool),
+    connect_args={"check_same_thread": False},  # Needed for SQLite
+    **POOL_OPTIONS
+)
+
+# The engine used for every write. It holds exactly one connection, which
+# only the writer thread (write_executor) uses, so writes are applied one at
+# a time in submission order and never compete with each other for SQLite's
+# lock.
+write_engine = create_engine(
+    DATABASE_URL,
+    poolclass=write_pool_metrics.pool_class(StaticPool),
+    connect_args={"check_same_thread": False}  # Opened and closed off the writer thread
+)
+
+# Create the async engine used while serving requests
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    poolclass=async_pool_metrics.pool_class(AsyncAdaptedQueuePool),
+    **POOL_OPTIONS
+)
+
+read_pool_metrics.instrument(engine)
+async_pool_metrics.instrument(async_engine.sync_engine)
+write_pool_metrics.instrument(write_engine)
+
+
+def _apply_pragmas(dbapi_connection, settings: dict) -> None:
+    cursor = dbapi_connection.cursor()
+    for name, value in settings.items():
+        cursor.execute(f"PRAGMA {name} = {value}")
+    cursor.close()
+
+
+def _register_functions(dbapi_connection) -> None:
+    # The statements keeping the full-text index in sync read descriptions
+    # through this function, as long ones are stored compressed. It is only
+    # ever called by the application's own statements, never by the schema,
+    # so other SQLite clients can still write to the database.
+    dbapi_connection.create_function(DECOMPRESS_FUNCTION, 1, decompress, deterministic=True)
+
+
+@event.listens_for(write_engine, "connect")
+def _configure_write_connection(dbapi_connection, connection_record):
+    """Apply the DB_PROFILE settings, including the journal mode of the file."""
+    _apply_pragmas(dbapi_connection, PRAGMA_PROFILES[DB_PROFILE])
+    _register_functions(dbapi_connection)
+
+
+@event.listens_for(engine, "connect")
+@event.listens_for(async_engine.sync_engine, "connect")
+def _configure_read_connection(dbapi_connection, connection_record):
+    """
+    Apply the DB_PROFILE settings to a read connection and make it reject
+    any statement that would modify the database.
+    """
+    profile = PRAGMA_PROFILES[DB_PROFILE]
+    settings = {name: profile[name] for name in CONNECTION_PRAGMAS}
+    _apply_pragmas(dbapi_connection, {**settings, "query_only": "ON"})
+    _register_functions(dbapi_connection)
+
+# Create a session factory. As with the async factory below, objects stay
+# loaded after commit so they can be serialized outside the worker thread.
+SessionLocal = sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    expire_on_commit=False,
+    bind=engine
 )
 
-# Create a session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Create a session factory for the writer thread
+WriteSessionLocal = sessionmaker(
+    autoflush=False,
+    expire_on_commit=False,
+    bind=write_engine
+)
+
+# Create an async session factory. Objects stay loaded after commit so
+# handlers can serialize them without another round trip.
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    autoflush=False,
+    expire_on_commit=False
+)
 
 # Create a scoped session for thread safety
 db_session = scoped_session(SessionLocal)
@@ -26,18 +220,262 @@ db_session = scoped_session(SessionLocal)
 # Create a base class for declarative models
 Base = declarative_base()
 
-# Dependency function to get a database session
-def get_db_session():
+# Thread pool used for reads by the "threaded" execution mode
+read_executor = InstrumentedExecutor("read", DB_READ_THREADS)
+
+# The writer thread, which owns the connection of write_engine. Its queue
+# is the write queue: tasks run strictly one after another.
+write_executor = InstrumentedExecutor("write", 1)
+
+
+def _write(function: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    with WriteSessionLocal() as session:
+        return function(session, *args, **kwargs)
+
+
+def _write_batch(operations: List[Operation]) -> List[Tuple[bool, Any]]:
+    with write_engine.connect() as connection:
+        return run_batch(connection, operations)
+
+
+async def execute_write(function: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Queue a data access function for the writer thread and await its result."""
+    return await write_executor.run(_write, function, *args, **kwargs)
+
+
+async def execute_batch(operations: List[Operation]) -> List[Tuple[bool, Any]]:
+    """Queue a batch of grouped writes for the writer thread."""
+    return await write_executor.run(_write_batch, operations)
+
+
+def _read_pragmas(connection_engine) -> dict:
+    with connection_engine.connect() as connection:
+        return {
+            name: connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+            for name in ("journal_mode",) + CONNECTION_PRAGMAS + ("query_only",)
+        }
+
+
+async def database_settings() -> dict:
+    """
+    Get the SQLite settings in effect on the write and read connections.
+
+    The values are read back from the connections rather than taken from
+    the profile, so they show what SQLite actually accepted (e.g. an
+    mmap_size capped by the build).
+    """
+    return {
+        "profile": DB_PROFILE,
+        "write": await write_executor.run(_read_pragmas, write_engine),
+        "read": await read_executor.run(_read_pragmas, engine),
+        "checkpoints": checkpoint_scheduler.stats(),
+    }
+
+
+class CheckpointScheduler:
+    """
+    Runs ``PRAGMA wal_checkpoint(PASSIVE)`` on the writer thread at a fixed interval.
+
+    A passive checkpoint copies as much of the WAL back into the database
+    file as it can without waiting for readers, so the log (and the work
+    every reader does to search it) stays small.
     """
-    Get a database session for dependency injection.
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._task: Optional["asyncio.Task[None]"] = None
+        self.runs = 0
+        self.last_run: Optional[float] = None
+        self.last_result: Optional[dict] = None
+        self.failures = 0
+        self.last_error: Optional[str] = None
+
+    @staticmethod
+    def _checkpoint() -> dict:
+        with write_engine.connect() as connection:
+            busy, log, checkpointed = connection.exec_driver_sql(
+                "PRAGMA wal_checkpoint(PASSIVE)"
+            ).one()
+        return {"busy": busy, "log_pages": log, "checkpointed_pages": checkpointed}
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.last_result = await write_executor.run(self._checkpoint)
+            except Exception as error:
+                # A failed checkpoint is retried at the next interval
+                logger.exception("WAL checkpoint failed")
+                self.failures += 1
+                self.last_error = repr(error)
+                continue
+            self.last_run = time.time()
+            self.runs += 1
+
+    def start(self) -> None:
+        """Start checkpointing if the profile uses WAL and an interval is set."""
+        if self.interval > 0 and PRAGMA_PROFILES[DB_PROFILE]["journal_mode"] == "WAL":
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop checkpointing."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        """Return the interval, the number of checkpoints, the last result and the failures."""
+        return {
+            "enabled": self._task is not None,
+            "interval": self.interval,
+            "runs": self.runs,
+            "last_run": self.last_run,
+            "last_result": self.last_result,
+            "failures": self.failures,
+            "last_error": self.last_error,
+        }
+
+
+# Keeps the WAL short while the application is running
+checkpoint_scheduler = CheckpointScheduler(DB_CHECKPOINT_INTERVAL)
+
+# Batches concurrent single-book writes into shared transactions
+group_committer = GroupCommitter(
+    execute_batch,
+    window=DB_GROUP_COMMIT_WINDOW_MS / 1000,
+    max_batch=DB_GROUP_COMMIT_MAX
+) if DB_GROUP_COMMIT else None
+
+
+class Database:
+    """
+    Runs data access functions for a request.
+    
+    The functions take a synchronous session as their first argument (see
+    ``repository.py``). Subclasses decide where reads are executed;
+    writes always go to the writer thread.
+    """
+    
+    async def read(self, function: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run a function that only reads from the database."""
+        raise NotImplementedError
+    
+    async def write(self, function: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        Run a function that modifies the database.
+        
+        Every write runs on the writer thread with its own session on the
+        write connection, whatever the execution mode.
+        """
+        return await execute_write(function, *args, **kwargs)
+    
+    async def write_grouped(self, function: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        Run a small write that may share its transaction with concurrent ones.
+        
+        With group commit enabled the function runs in a savepoint of a
+        batch transaction (see ``group_commit.py``), otherwise this is the
+        same as :meth:`write`.
+        """
+        if group_committer is None:
+            return await self.write(function, *args, **kwargs)
+        return await group_committer.submit(function, *args, **kwargs)
+
+
+class AsyncDatabase(Database):
+    """Runs reads on an async session through ``run_sync``."""
+    
+    def __init__(self, session: AsyncSession):
+        self.session = session
+    
+    async def read(self, function: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        return await self.session.run_sync(function, *args, **kwargs)
+
+
+class ThreadedDatabase(Database):
+    """
+    Runs reads on a synchronous session in the read pool.
+    
+    The session is closed by the worker thread at the end of every call, so
+    its connection goes back to the pool as soon as the work is done rather
+    than when the request finishes. Loaded objects stay usable afterwards.
+    """
+    
+    def __init__(self, session: Session):
+        self.session = session
     
-    This function creates a new database session and closes it after use.
+    def _call(self, function: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        try:
+            return function(self.session, *args, **kwargs)
+        finally:
+            self.session.close()
+    
+    async def read(self, function: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        return await read_executor.run(self._call, function, *args, **kwargs)
+
+
+# Dependency function to get a database for the request
+async def get_db():
+    """
+    Get a database for dependency injection.
+    
+    This function creates a new database session, wrapped according to
+    DB_EXECUTION, and closes it after use.
+    """
+    if DB_EXECUTION == "threaded":
+        # Each call closes the session itself in its worker thread
+        yield ThreadedDatabase(SessionLocal())
+    else:
+        async with AsyncSessionLocal() as session:
+            yield AsyncDatabase(session)
+
+
+async def startup_db():
+    """
+    Start the background database tasks.
+    
+    This function should be called when the application starts serving.
     """
-    session = SessionLocal()
-    try:
-        yield session
-    finally:
-        session.close()
+    checkpoint_scheduler.start()
+
+
+async def shutdown_db():
+    """
+    Release the database resources held by the application.
+    
+    This function should be called when the application stops.
+    """
+    await checkpoint_scheduler.stop()
+    if group_committer is not None:
+        await group_committer.shutdown()
+    await async_engine.dispose()
+    read_executor.shutdown()
+    write_executor.shutdown()
+    write_engine.dispose()
+
+
+def _load_compression_dictionary(dictionary_id: int) -> Optional[bytes]:
+    """
+    Read a compression dictionary trained after this process started.
+    
+    Args:
+        dictionary_id: The ID of the dictionary.
+    
+    Returns:
+        The dictionary, or None if it does not exist.
+    """
+    with engine.connect() as connection:
+        return connection.exec_driver_sql(
+            "SELECT data FROM compression_dictionaries WHERE id = ?", (dictionary_id,)
+        ).scalar()
+
+
+dictionaries.loader = _load_compression_dictionary
+
 
 def init_db():
     """
@@ -47,6 +485,24 @@ def init_db():
     """
     # Import models here to avoid circular imports
     import models  # noqa
+    from search import create_search_index
+    
+    # Create all tables. The read engines are read-only, so the schema is
+    # set up through the write engine.
+    Base.metadata.create_all(bind=write_engine)
+    
+    # create_all skips tables that already exist, so add any indexes
+    # declared after the table was first created
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=write_engine, checkfirst=True)
+    
+    # Compress new descriptions with the newest trained dictionary
+    with write_engine.connect() as connection:
+        for dictionary_id, data in connection.exec_driver_sql(
+            "SELECT id, data FROM compression_dictionaries"
+        ):
+            dictionaries.add(dictionary_id, data)
     
-    # Create all tables
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    # Full-text index over title, author and description
+    create_search_index(write_engine)
\ No newline at end of file
@@ -0,0 +1,76 @@
+"""
+Data transfer objects for the Litestar and SQLAlchemy application.
+
+A DTO lets a handler return ``Book`` instances and leaves their conversion
+to Litestar: from the fields of the model, the framework generates a
+transfer function once per route and runs it for every response, instead
+of a hand-written ``to_dict`` call per book. Which fields are sent, and
+under which names, is set per route through the DTO's configuration.
+
+``BookDTO`` reads the fields of a model from its SQLAlchemy mapper. It is
+used instead of ``SQLAlchemyDTO`` from advanced-alchemy, which cannot
+describe columns whose default is a SQL expression, like the timestamps of
+``Book``, and would add a dependency for a single model.
+"""
+from functools import lru_cache
+from typing import Annotated, Any, Dict, Generator, Optional, Tuple
+
+from litestar.dto import AbstractDTO, DTOConfig, DTOField, Mark
+from litestar.dto.data_structures import DTOFieldDefinition
+from litestar.typing import FieldDefinition
+from sqlalchemy import inspect
+
+from models import Book
+
+
+class BookDTO(AbstractDTO):
+    """
+    DTO over the columns of a SQLAlchemy model.
+
+    Every mapped column becomes a field typed after the column's Python
+    type. Nullable columns are optional, and the primary key and columns
+    filled in by the database are read-only, so they are sent in responses
+    but never accepted from a request body.
+    """
+
+    @classmethod
+    def generate_field_definitions(cls, model_type: Any) -> Generator[DTOFieldDefinition, None, None]:
+        for attribute in inspect(model_type).column_attrs:
+            column = attribute.columns[0]
+            annotation = column.type.python_type
+            if column.nullable:
+                annotation = Optional[annotation]
+            generated = column.primary_key or column.server_default is not None
+            yield DTOFieldDefinition.from_field_definition(
+                field_definition=FieldDefinition.from_kwarg(annotation=annotation, name=attribute.key),
+                model_name=model_type.__name__,
+                default_factory=None,
+                dto_field=DTOField(mark=Mark.READ_ONLY if generated else None),
+            )
+
+    @classmethod
+    def detect_nested_field(cls, field_definition: FieldDefinition) -> bool:
+        return False
+
+
+@lru_cache(maxsize=None)
+def book_dto(exclude: Tuple[str, ...] = (), rename: Optional[Tuple[Tuple[str, str], ...]] = None) -> type:
+    """
+    Return the DTO serializing books for a route.
+
+    Routes asking for the same configuration share one DTO class.
+
+    Args:
+        exclude: Fields left out of the response.
+        rename: Pairs of a field and the name it is sent under.
+
+    Returns:
+        A ``BookDTO`` subclass to use as a handler's ``return_dto``.
+    """
+    rename_fields: Dict[str, str] = dict(rename or ())
+    config = DTOConfig(
+        exclude=set(exclude),
+        rename_fields=rename_fields,
+        experimental_codegen_backend=True
+    )
+    return BookDTO[Annotated[Book, config]]
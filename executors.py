@@ -0,0 +1,103 @@
+"""
+Instrumented thread pools for the Litestar and SQLAlchemy application.
+
+When the application runs its database work on the synchronous engine, the
+work is handed to bounded thread pools so that the event loop stays free.
+The pools record how many tasks are waiting and how long they waited, which
+is what is needed to size database concurrency.
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+T = TypeVar("T")
+
+# Number of recent wait times kept for the percentiles
+WAIT_SAMPLES = 1000
+
+
+class InstrumentedExecutor:
+    """
+    A fixed-size thread pool that reports queue depth and wait times.
+
+    The wait time of a task is the time between its submission and the
+    moment a worker thread starts running it.
+    """
+
+    def __init__(self, name: str, max_workers: int):
+        self.name = name
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix=f"db-{name}"
+        )
+        self._lock = threading.Lock()
+        self._wait_times: "deque[float]" = deque(maxlen=WAIT_SAMPLES)
+        self.queued = 0
+        self.active = 0
+        self.completed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def submit(self, function: Callable[..., T], *args: Any, **kwargs: Any) -> "Future[T]":
+        """Schedule ``function(*args, **kwargs)`` on the pool."""
+        submitted_at = time.perf_counter()
+        with self._lock:
+            self.queued += 1
+
+        def run() -> T:
+            wait = time.perf_counter() - submitted_at
+            with self._lock:
+                self.queued -= 1
+                self.active += 1
+                self.total_wait += wait
+                self.max_wait = max(self.max_wait, wait)
+                self._wait_times.append(wait)
+            try:
+                return function(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.active -= 1
+                    self.completed += 1
+
+        future = self._executor.submit(run)
+        future.add_done_callback(self._forget_cancelled)
+        return future
+
+    def _forget_cancelled(self, future: Future) -> None:
+        """Remove a task that was cancelled before it started from the queue count."""
+        if future.cancelled():
+            with self._lock:
+                self.queued -= 1
+
+    async def run(self, function: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run ``function(*args, **kwargs)`` on the pool and await its result."""
+        return await asyncio.wrap_future(self.submit(function, *args, **kwargs))
+
+    def stats(self) -> dict:
+        """Return the pool size, queue depth and wait time statistics."""
+        with self._lock:
+            waits = sorted(self._wait_times)
+            started = self.completed + self.active
+
+            def percentile(fraction: float) -> float:
+                return waits[min(len(waits) - 1, int(len(waits) * fraction))] if waits else 0.0
+
+            return {
+                "name": self.name,
+                "max_workers": self.max_workers,
+                "queued": self.queued,
+                "active": self.active,
+                "completed": self.completed,
+                "wait_mean": self.total_wait / started if started else 0.0,
+                "wait_p50": percentile(0.50),
+                "wait_p99": percentile(0.99),
+                "wait_max": self.max_wait,
+            }
+
+    def shutdown(self) -> None:
+        """Stop the worker threads once queued tasks have finished."""
+        self._executor.shutdown(wait=True)
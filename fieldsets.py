@@ -0,0 +1,117 @@
+"""
+Sparse fieldset helpers for the Litestar and SQLAlchemy application.
+
+Clients can pass ``?fields=id,title,author`` to receive only some of a book's
+attributes. The selection is pushed down into SQL with ``load_only``, so
+unrequested columns such as the unbounded ``description`` are never read.
+
+Collection reads go further and leave the deferred columns out unless they
+are asked for, either by name in ``fields`` or with ``?include=description``.
+"""
+from typing import List, Optional
+
+from litestar.exceptions import ValidationException
+from sqlalchemy.orm import Query, load_only
+
+from models import Book
+
+# Names of all columns that can be requested, in output order
+FIELDS = tuple(column.key for column in Book.__table__.columns)
+
+# Columns only returned by collection reads on request. They dominate the
+# size of a row, and long values spill into overflow pages that SQLite then
+# does not have to read.
+DEFERRED_FIELDS = ("description",)
+
+# Fields of each book in a collection read by default
+SUMMARY_FIELDS = tuple(name for name in FIELDS if name not in DEFERRED_FIELDS)
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """
+    Parse a comma separated ``fields`` query parameter.
+
+    Args:
+        fields: The raw parameter value, e.g. ``"id,title"``.
+
+    Returns:
+        The requested field names in output order, or None when every
+        field should be returned.
+
+    Raises:
+        ValidationException: If an unknown field is requested.
+    """
+    if not fields:
+        return None
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested.difference(FIELDS)
+    if unknown:
+        raise ValidationException(
+            f"Unknown fields: {', '.join(sorted(unknown))}. Allowed: {', '.join(FIELDS)}"
+        )
+    return [name for name in FIELDS if name in requested] or None
+
+
+def parse_include(include: Optional[str]) -> List[str]:
+    """
+    Parse a comma separated ``include`` query parameter.
+
+    Args:
+        include: The raw parameter value, e.g. ``"description"``.
+
+    Returns:
+        The deferred field names to include.
+
+    Raises:
+        ValidationException: If a field that is not deferred is named.
+    """
+    if not include:
+        return []
+    requested = {name.strip() for name in include.split(",") if name.strip()}
+    unknown = requested.difference(DEFERRED_FIELDS)
+    if unknown:
+        raise ValidationException(
+            f"Unknown fields to include: {', '.join(sorted(unknown))}. "
+            f"Allowed: {', '.join(DEFERRED_FIELDS)}"
+        )
+    return [name for name in DEFERRED_FIELDS if name in requested]
+
+
+def collection_fields(fields: Optional[List[str]], include: List[str]) -> Optional[List[str]]:
+    """
+    Resolve the fields returned for each book of a collection.
+
+    Args:
+        fields: Field names from :func:`parse_fields`, or None.
+        include: Deferred field names from :func:`parse_include`.
+
+    Returns:
+        The explicit selection plus the included fields when ``fields`` is
+        given, None when every field, deferred ones included, should be
+        returned, and otherwise every field except the deferred ones that
+        were not included.
+    """
+    if fields is not None:
+        return [name for name in FIELDS if name in fields or name in include]
+    if set(include).issuperset(DEFERRED_FIELDS):
+        return None
+    return [name for name in FIELDS if name not in DEFERRED_FIELDS or name in include]
+
+
+def load_fields(query: Query, fields: Optional[List[str]], *required: str) -> Query:
+    """
+    Restrict a query over :class:`Book` to the given columns.
+
+    Args:
+        query: The query to restrict.
+        fields: Field names from :func:`parse_fields`, or None for all.
+        required: Extra columns the caller needs internally, such as the
+            sort key used for pagination.
+
+    Returns:
+        The query with a ``load_only`` option applied.
+    """
+    if fields is None:
+        return query
+    names = set(fields).union(required)
+    return query.options(load_only(*(getattr(Book, name) for name in names)))
@@ -0,0 +1,150 @@
+"""
+Server-side filtering for the books collection.
+
+Every filter is written so that SQLite can answer it from an index: exact
+author matches and numeric ranges map onto the composite indexes declared on
+:class:`Book`, and title prefixes become a range scan on ``ix_books_title``
+instead of a ``LIKE`` that would force a full table scan. Ranges can also
+be kept off their indexes, so that the sort key's index drives the query
+and returns the rows already ordered; :func:`repository.list_books` decides
+which way a page is read.
+"""
+import sys
+from typing import List, Optional, Set
+
+from litestar.exceptions import ValidationException
+from sqlalchemy.orm import InstrumentedAttribute
+from sqlalchemy.sql import ColumnElement
+from sqlalchemy.sql.expression import UnaryExpression
+from sqlalchemy.sql.operators import custom_op
+
+from models import Book
+
+# Code points reserved for UTF-16 surrogates
+_SURROGATES = (0xD800, 0xDFFF)
+
+
+def prefix_upper_bound(prefix: str) -> str:
+    """
+    Return the smallest string greater than every string starting with ``prefix``.
+
+    ``title >= prefix AND title < prefix_upper_bound(prefix)`` selects the
+    same rows as ``title LIKE 'prefix%'`` but can seek into an index.
+
+    Raises:
+        ValidationException: If the prefix ends with the last Unicode code
+            point, which has no successor.
+    """
+    last = ord(prefix[-1])
+    if last == sys.maxunicode:
+        raise ValidationException("title_prefix must not end with U+10FFFF")
+    following = last + 1
+    if _SURROGATES[0] <= following <= _SURROGATES[1]:
+        # Surrogates cannot be encoded, and no title contains one
+        following = _SURROGATES[1] + 1
+    return prefix[:-1] + chr(following)
+
+
+def without_index(column: InstrumentedAttribute) -> ColumnElement:
+    """Return ``+column``, which compares like the column but cannot use its index."""
+    return UnaryExpression(column.expression, operator=custom_op("+"), type_=column.type)
+
+
+def _indexable(column: InstrumentedAttribute, sort_key: Optional[str]) -> ColumnElement:
+    """
+    Return the column as written in a range condition of a list ordered by ``sort_key``.
+
+    A range on any other column is written as ``+column``. The index of the
+    sort key then drives the query and returns the rows already in order,
+    instead of SQLite picking the filter's index and sorting every match in
+    a temporary B-tree.
+    """
+    if sort_key is None or column.key == sort_key:
+        return column
+    return without_index(column)
+
+
+def range_columns(
+    title_prefix: Optional[str] = None,
+    min_year: Optional[int] = None,
+    max_year: Optional[int] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    **filters
+) -> Set[str]:
+    """
+    Return the names of the columns the given filters bound with a range.
+
+    Args:
+        title_prefix: Case-sensitive prefix of the title.
+        min_year: Lowest publication year.
+        max_year: Highest publication year.
+        min_price: Lowest price.
+        max_price: Highest price.
+        filters: The other arguments of :func:`filter_conditions`, ignored.
+    """
+    columns = set()
+    if title_prefix:
+        columns.add(Book.title.key)
+    if min_year is not None or max_year is not None:
+        columns.add(Book.published_year.key)
+    if min_price is not None or max_price is not None:
+        columns.add(Book.price.key)
+    return columns
+
+
+def filter_conditions(
+    author: Optional[str] = None,
+    title_prefix: Optional[str] = None,
+    min_year: Optional[int] = None,
+    max_year: Optional[int] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    sort_key: Optional[str] = None,
+) -> List[ColumnElement]:
+    """
+    Build the WHERE conditions for the given filters.
+
+    All bounds are inclusive, and filters left as None are not applied.
+    The conditions can be used with ORM queries as well as Core statements.
+
+    Args:
+        author: Exact author name.
+        title_prefix: Case-sensitive prefix of the title.
+        min_year: Lowest publication year.
+        max_year: Highest publication year.
+        min_price: Lowest price.
+        max_price: Highest price.
+        sort_key: Column whose index should return the rows in order, if
+            any. Ranges on other columns are then kept off their indexes.
+
+    Returns:
+        The conditions, to be combined with AND.
+
+    Raises:
+        ValidationException: If a range has its lower bound above its upper bound.
+    """
+    if min_year is not None and max_year is not None and min_year > max_year:
+        raise ValidationException("min_year must not be greater than max_year")
+    if min_price is not None and max_price is not None and min_price > max_price:
+        raise ValidationException("min_price must not be greater than max_price")
+
+    conditions = []
+    if author is not None:
+        conditions.append(Book.author == author)
+    if title_prefix:
+        title = _indexable(Book.title, sort_key)
+        conditions.append(title >= title_prefix)
+        conditions.append(title < prefix_upper_bound(title_prefix))
+    published_year = _indexable(Book.published_year, sort_key)
+    if min_year is not None:
+        conditions.append(published_year >= min_year)
+    if max_year is not None:
+        conditions.append(published_year <= max_year)
+    price = _indexable(Book.price, sort_key)
+    if min_price is not None:
+        conditions.append(price >= min_price)
+    if max_price is not None:
+        conditions.append(price <= max_price)
+    return conditions
+
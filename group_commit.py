@@ -0,0 +1,198 @@
+"""
+Group commit for the Litestar and SQLAlchemy application.
+
+Every write transaction on SQLite ends with a commit, and with it a sync of
+the database file to disk, while writers queue up behind a single database
+lock. Under a burst of small writes that sync dominates. A
+:class:`GroupCommitter` collects the writes that arrive within a short
+window and applies them in one transaction, so the burst pays for one
+commit instead of one per request.
+
+Each write runs in its own savepoint inside the shared transaction. A write
+that fails is rolled back on its own and its error is returned to its
+caller only; the others are committed together.
+"""
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, List, Optional, Tuple, TypeVar
+
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+T = TypeVar("T")
+
+# A queued write: the data access function, its arguments and the future
+# that receives its outcome
+Operation = Tuple[Callable[..., Any], tuple, dict, "asyncio.Future[Any]"]
+
+
+def run_batch(connection: Connection, operations: List[Operation]) -> List[Tuple[bool, Any]]:
+    """
+    Apply a batch of writes in a single transaction.
+
+    Each data access function gets a session joined to the shared
+    transaction through a savepoint: its ``session.commit()`` only releases
+    the savepoint and ``session.rollback()`` (or an exception) discards just
+    its own changes. The transaction is committed once, at the end.
+
+    Args:
+        connection: Synchronous connection to run the batch on.
+        operations: The writes to apply, in order.
+
+    Returns:
+        For every write, ``(True, result)`` or ``(False, exception)``.
+    """
+    # Take the write lock up front; without an explicit BEGIN the driver
+    # would let the first savepoint start (and its release end) the
+    # transaction
+    connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+    outcomes = []
+    for function, args, kwargs, _ in operations:
+        session = Session(
+            bind=connection,
+            join_transaction_mode="create_savepoint",
+            autoflush=False,
+            expire_on_commit=False
+        )
+        try:
+            outcomes.append((True, function(session, *args, **kwargs)))
+        except Exception as error:
+            outcomes.append((False, error))
+        finally:
+            session.close()
+
+    connection.commit()
+    return outcomes
+
+
+class GroupCommitter:
+    """
+    Coalesces concurrent writes into shared transactions.
+
+    Writes are queued by :meth:`submit`. A background task takes the first
+    queued write, waits up to ``window`` seconds for more (or until
+    ``max_batch`` are queued), and hands the batch to ``execute``. Batches
+    are written one at a time; writes arriving meanwhile form the next one,
+    so a write waits for at most one window plus one batch ahead of it.
+    """
+
+    def __init__(
+        self,
+        execute: Callable[[List[Operation]], Awaitable[List[Tuple[bool, Any]]]],
+        window: float,
+        max_batch: int
+    ):
+        """
+        Args:
+            execute: Runs :func:`run_batch` for a batch on a connection.
+            window: Seconds to wait for more writes after the first one.
+            max_batch: Maximum number of writes per transaction.
+        """
+        self.execute = execute
+        self.window = window
+        self.max_batch = max_batch
+        self._queue: Optional["asyncio.Queue[Operation]"] = None
+        self._task: Optional["asyncio.Task[None]"] = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.operations = 0
+        self.failures = 0
+        self.largest_batch = 0
+
+    async def submit(self, function: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        Queue a write and wait until its batch has been committed.
+
+        Args:
+            function: Data access function taking a session as first argument.
+            args: Positional arguments for ``function``.
+            kwargs: Keyword arguments for ``function``.
+
+        Returns:
+            The return value of ``function``.
+
+        Raises:
+            Exception: Whatever ``function`` raised, or the error that made
+                the whole batch fail.
+        """
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            # Start (or restart, e.g. on a new event loop) the batching task
+            self._queue = asyncio.Queue()
+            self._task = loop.create_task(self._run())
+
+        future = loop.create_future()
+        self._queue.put_nowait((function, args, kwargs, future))
+        return await future
+
+    async def _collect(self) -> List[Operation]:
+        """Wait for the next batch of writes."""
+        queue = self._queue
+        batch = [await queue.get()]
+
+        # Whatever queued up while the previous batch was written goes first
+        while len(batch) < self.max_batch and not queue.empty():
+            batch.append(queue.get_nowait())
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.window
+        while len(batch) < self.max_batch:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        """Write batches until cancelled."""
+        while True:
+            batch = await self._collect()
+            try:
+                outcomes = await self.execute(batch)
+            except Exception as error:
+                # The transaction itself failed, so none of the writes stuck
+                outcomes = [(False, error)] * len(batch)
+
+            with self._lock:
+                self.batches += 1
+                self.operations += len(batch)
+                self.failures += sum(1 for succeeded, _ in outcomes if not succeeded)
+                self.largest_batch = max(self.largest_batch, len(batch))
+
+            for (*_, future), (succeeded, value) in zip(batch, outcomes):
+                if future.done():
+                    # The caller went away (e.g. the request was cancelled)
+                    continue
+                if succeeded:
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
+
+    async def shutdown(self) -> None:
+        """Stop the batching task. Writes still queued are cancelled."""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._queue is not None:
+            while not self._queue.empty():
+                self._queue.get_nowait()[3].cancel()
+
+    def stats(self) -> dict:
+        """Return the configuration and the batch statistics."""
+        with self._lock:
+            return {
+                "window": self.window,
+                "max_batch": self.max_batch,
+                "batches": self.batches,
+                "operations": self.operations,
+                "failures": self.failures,
+                "mean_batch": self.operations / self.batches if self.batches else 0.0,
+                "largest_batch": self.largest_batch,
+            }
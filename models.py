@@ -4,10 +4,18 @@ Database models for the Litestar and SQLAlchemy application.
 This module defines SQLAlchemy ORM models.
 """
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Text, DateTime, Float
+from typing import Iterable, Optional
 
+from sqlalchemy import Column, Integer, String, DateTime, Float, Index, LargeBinary, func
+
+from compression import CompressedText
 from database import Base
 
+# Current UTC time with millisecond precision, computed by SQLite. Used as
+# both the INSERT default and the table's DEFAULT clause, so timestamps come
+# from the database and can be read back with RETURNING.
+utc_now = func.strftime("%Y-%m-%d %H:%M:%f", "now")
+
 class Book(Base):
     """
     Book model representing a book in a library or bookstore.
@@ -16,28 +24,69 @@ class Book(Base):
     """
     __tablename__ = "books"
     
+    # Composite indexes backing the collection filters: an exact author
+    # match followed by a range or ordering on a second column.
+    __table_args__ = (
+        Index("ix_books_author_title", "author", "title"),
+        Index("ix_books_author_published_year", "author", "published_year"),
+        Index("ix_books_author_price", "author", "price"),
+    )
+    
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(100), nullable=False, index=True)
     author = Column(String(100), nullable=False, index=True)
-    description = Column(Text, nullable=True)
-    price = Column(Float, nullable=True)
-    published_year = Column(Integer, nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    price = Column(Float, nullable=True, index=True)
+    published_year = Column(Integer, nullable=True, index=True)
+    created_at = Column(DateTime, default=utc_now, server_default=utc_now)
+    updated_at = Column(DateTime, default=utc_now, server_default=utc_now, onupdate=utc_now)
+    # SQLite stores a row's columns in this order and stops reading at the
+    # last one a query needs, so the unbounded description comes last: a
+    # query without it never reads the overflow pages a long one spills to.
+    # Long descriptions are stored compressed (see compression.py).
+    description = Column(CompressedText, nullable=True)
     
     def __repr__(self):
         """String representation of the book."""
         return f"<Book {self.title} by {self.author}>"
         
-    def to_dict(self):
-        """Convert the model instance to a dictionary."""
+    def to_dict(self, fields: Optional[Iterable[str]] = None):
+        """
+        Convert the model instance to a dictionary.
+        
+        Args:
+            fields: Optional subset of attributes to include. Only these
+                attributes are read, so columns left out of the query
+                are not loaded.
+        """
+        if fields is not None:
+            data = {}
+            for name in fields:
+                value = getattr(self, name)
+                data[name] = value.isoformat() if isinstance(value, datetime) else value
+            return data
+        
         return {
             "id": self.id,
             "title": self.title,
             "author": self.author,
-            "description": self.description,
             "price": self.price,
             "published_year": self.published_year,
             "created_at": self.created_at.isoformat() if self.created_at else None,
-            "updated_at": self.updated_at.isoformat() if self.updated_at else None
-        }
\ No newline at end of file
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+            "description": self.description
+        }
+
+
+class CompressionDictionary(Base):
+    """
+    A preset dictionary that compressed descriptions refer to.
+    
+    Rows are only ever added: a compressed value names the dictionary it
+    was compressed with, which has to stay readable for as long as the
+    value exists.
+    """
+    __tablename__ = "compression_dictionaries"
+    
+    id = Column(Integer, primary_key=True)
+    data = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime, server_default=utc_now)
@@ -0,0 +1,218 @@
+"""
+Keyset (cursor) pagination helpers for the Litestar and SQLAlchemy application.
+
+Instead of OFFSET, each page is fetched with a ``WHERE (sort_key, id) > (...)``
+condition built from the last row of the previous page. That lets SQLite seek
+straight into the index, so page N costs the same as page 1.
+"""
+import base64
+import binascii
+import json
+from typing import Any, List, NamedTuple, Optional, Tuple
+
+from litestar.exceptions import ValidationException
+from sqlalchemy import and_, or_, tuple_
+from sqlalchemy.orm import Query
+
+from filters import without_index
+from models import Book
+
+# Page size used when the client does not ask for one
+DEFAULT_PAGE_SIZE = 50
+
+# Hard server-side limit on the number of rows returned per page
+MAX_PAGE_SIZE = 500
+
+# Response header carrying the cursor for the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Columns the collection can be ordered by. Each one is indexed, and the
+# primary key is always appended as a tie-breaker so the ordering is total.
+SORT_KEYS = {
+    "id": Book.id,
+    "title": Book.title,
+    "author": Book.author,
+    "published_year": Book.published_year,
+    "price": Book.price,
+}
+
+
+class Page(NamedTuple):
+    """A single page of results plus the cursor pointing at the next one."""
+
+    items: List[Any]
+    next_cursor: Optional[str]
+
+
+def parse_sort(sort: str) -> Tuple[str, bool]:
+    """
+    Parse a sort expression such as ``title`` or ``-title``.
+
+    Args:
+        sort: Name of a sortable column, optionally prefixed with ``-``
+            for descending order.
+
+    Returns:
+        The column name and whether the order is descending.
+
+    Raises:
+        ValidationException: If the column cannot be sorted on.
+    """
+    descending = sort.startswith("-")
+    name = sort[1:] if descending else sort
+    if name not in SORT_KEYS:
+        raise ValidationException(
+            f"Cannot sort by '{name}'. Allowed: {', '.join(SORT_KEYS)}"
+        )
+    return name, descending
+
+
+def encode_cursor(sort: str, values: List[Any]) -> str:
+    """
+    Encode the key values of the last row of a page into an opaque cursor.
+
+    Args:
+        sort: The sort expression the page was produced with.
+        values: The key values of the last row, in key order.
+
+    Returns:
+        A URL-safe cursor string.
+    """
+    payload = json.dumps({"s": sort, "k": values}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> List[Any]:
+    """
+    Decode a cursor produced by :func:`encode_cursor`.
+
+    Args:
+        cursor: The cursor received from the client.
+        sort: The sort expression of the current request.
+
+    Returns:
+        The key values stored in the cursor.
+
+    Raises:
+        ValidationException: If the cursor is malformed or was issued
+            for a different sort order.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        stored_sort, values = payload["s"], payload["k"]
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise ValidationException("Invalid pagination cursor")
+    if stored_sort != sort or not isinstance(values, list):
+        raise ValidationException("Pagination cursor does not match the requested sort")
+    # Values are bound into the seek condition, so only accept what a real
+    # cursor holds: scalar sort keys followed by the integer ID
+    if not values or not all(_is_key_value(value) for value in values) or not _is_id(values[-1]):
+        raise ValidationException("Invalid pagination cursor")
+    return values
+
+
+def _is_key_value(value: Any) -> bool:
+    """Tell whether a cursor value is a scalar a sort key can hold."""
+    return value is None or (isinstance(value, (int, float, str)) and not isinstance(value, bool))
+
+
+def _is_id(value: Any) -> bool:
+    """Tell whether a cursor value is a book ID."""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _seek_condition(keys: List[Any], values: List[Any], descending: bool, seek_index: bool):
+    """
+    Build the WHERE condition selecting rows strictly after the cursor.
+
+    SQLite sorts NULLs first in ascending order and last in descending
+    order, and a row value comparison against NULL is never true, so
+    nullable sort keys need explicit ``IS NULL`` branches.
+    """
+    nullable = Book.__table__.c[keys[0].key].nullable
+    if not seek_index:
+        keys = [without_index(key) for key in keys]
+    if len(keys) == 1:
+        return keys[0] < values[0] if descending else keys[0] > values[0]
+
+    (column, row_id), (value, last_id) = keys, values
+    key, bound = tuple_(*keys), tuple_(*values)
+
+    if value is None:
+        # Only the remaining NULL rows can follow when descending; when
+        # ascending, every non-NULL row follows as well.
+        if descending:
+            return and_(column.is_(None), row_id < last_id)
+        return or_(and_(column.is_(None), row_id > last_id), column.isnot(None))
+
+    if descending and nullable:
+        return or_(key < bound, column.is_(None))
+    return key < bound if descending else key > bound
+
+
+def _keys_for(name: str) -> List[Any]:
+    """Return the columns a page sorted by ``name`` is keyed on."""
+    column = SORT_KEYS[name]
+    return [Book.id] if column is Book.id else [column, Book.id]
+
+
+def page_query(
+    query: Query,
+    sort: str,
+    limit: int,
+    after: Optional[str] = None,
+    seek_index: bool = True
+) -> Query:
+    """
+    Build the query for one page without running it.
+
+    Works the same on an ORM query and on a Core ``select()``.
+
+    Args:
+        query: The base query to paginate.
+        sort: Sort expression, e.g. ``id``, ``title`` or ``-author``.
+        limit: Maximum number of rows to return.
+        after: Cursor returned with the previous page, if any.
+        seek_index: Whether the cursor condition may seek into the sort
+            key's index. Pass False when the rows are read through the index
+            of a filter instead, which SQLite would otherwise pass over for
+            the cursor's range on the sort key.
+
+    Returns:
+        The query, limited to ``limit + 1`` rows so the caller can tell
+        whether another page follows.
+    """
+    name, descending = parse_sort(sort)
+    keys = _keys_for(name)
+
+    if after is not None:
+        values = decode_cursor(after, sort)
+        if len(values) != len(keys):
+            raise ValidationException("Invalid pagination cursor")
+        query = query.filter(_seek_condition(keys, values, descending, seek_index))
+
+    order_by = [key.desc() if descending else key.asc() for key in keys]
+    return query.order_by(*order_by).limit(limit + 1)
+
+
+def page_of(rows: List[Any], sort: str, limit: int) -> Page:
+    """
+    Turn the rows fetched with :func:`page_query` into a page.
+
+    Args:
+        rows: Up to ``limit + 1`` books or rows, in page order.
+        sort: Sort expression the rows were fetched with.
+        limit: Maximum number of rows in the page.
+
+    Returns:
+        The first ``limit`` rows and the cursor of the next page, if any.
+    """
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        keys = _keys_for(parse_sort(sort)[0])
+        next_cursor = encode_cursor(sort, [getattr(last, key.key) for key in keys])
+
+    return Page(items=rows, next_cursor=next_cursor)
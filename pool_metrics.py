@@ -0,0 +1,137 @@
+"""
+Connection pool metrics for the Litestar and SQLAlchemy application.
+
+The engines' pools are instrumented with SQLAlchemy pool events, which count
+checkouts, check-ins and the connections opened and closed (churn), and with
+a thin pool subclass that times how long each checkout waited for a
+connection (including the time to open one when the pool grows). Together
+they show whether the pools are sized right.
+"""
+import threading
+import time
+from typing import Tuple, Type
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import Pool
+
+# Upper bounds, in seconds, of the checkout wait histogram buckets; waits
+# above the last bound go to an overflow bucket
+WAIT_BUCKETS: Tuple[float, ...] = (0.0001, 0.001, 0.01, 0.1, 1.0)
+
+
+class PoolMetrics:
+    """Counters and a wait time histogram for one connection pool."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self.checked_out = 0
+        self.max_checked_out = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.closes = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self._histogram = [0] * (len(WAIT_BUCKETS) + 1)
+
+    def pool_class(self, base: Type[Pool]) -> Type[Pool]:
+        """
+        Return a subclass of ``base`` that reports checkout wait times here.
+
+        The subclass survives ``engine.dispose()``, which recreates the pool
+        from its class.
+
+        Args:
+            base: The pool class the engine would otherwise use.
+
+        Returns:
+            The instrumented pool class, to pass as ``poolclass``.
+        """
+        metrics = self
+
+        class InstrumentedPool(base):
+            def _do_get(self):
+                started = time.perf_counter()
+                try:
+                    return super()._do_get()
+                except PoolTimeoutError:
+                    with metrics._lock:
+                        metrics.timeouts += 1
+                    raise
+                finally:
+                    metrics._record_wait(time.perf_counter() - started)
+
+        InstrumentedPool.__name__ = f"Instrumented{base.__name__}"
+        return InstrumentedPool
+
+    def _record_wait(self, wait: float) -> None:
+        bucket = next(
+            (i for i, bound in enumerate(WAIT_BUCKETS) if wait <= bound),
+            len(WAIT_BUCKETS)
+        )
+        with self._lock:
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            self._histogram[bucket] += 1
+
+    def instrument(self, engine: Engine) -> None:
+        """
+        Count the pool events of an engine.
+
+        Args:
+            engine: A synchronous engine (``async_engine.sync_engine`` for
+                an async one).
+        """
+        @event.listens_for(engine, "connect")
+        def on_connect(dbapi_connection, connection_record):
+            with self._lock:
+                self.connects += 1
+
+        @event.listens_for(engine, "close")
+        def on_close(dbapi_connection, connection_record):
+            with self._lock:
+                self.closes += 1
+
+        @event.listens_for(engine, "invalidate")
+        def on_invalidate(dbapi_connection, connection_record, exception):
+            with self._lock:
+                self.invalidations += 1
+
+        @event.listens_for(engine, "checkout")
+        def on_checkout(dbapi_connection, connection_record, connection_proxy):
+            with self._lock:
+                self.checkouts += 1
+                self.checked_out += 1
+                self.max_checked_out = max(self.max_checked_out, self.checked_out)
+
+        @event.listens_for(engine, "checkin")
+        def on_checkin(dbapi_connection, connection_record):
+            with self._lock:
+                self.checkins += 1
+                self.checked_out -= 1
+
+    def stats(self) -> dict:
+        """Return the counters and the wait time histogram."""
+        with self._lock:
+            waits = sum(self._histogram)
+            labels = [f"<={bound * 1000:g}ms" for bound in WAIT_BUCKETS]
+            labels.append(f">{WAIT_BUCKETS[-1] * 1000:g}ms")
+            return {
+                "name": self.name,
+                "checked_out": self.checked_out,
+                "max_checked_out": self.max_checked_out,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "connects": self.connects,
+                "closes": self.closes,
+                "invalidations": self.invalidations,
+                "timeouts": self.timeouts,
+                "wait_mean": self.total_wait / waits if waits else 0.0,
+                "wait_max": self.max_wait,
+                "wait_histogram": dict(zip(labels, self._histogram)),
+            }
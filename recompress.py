@@ -0,0 +1,147 @@
+"""
+Re-encode the stored descriptions with a freshly trained dictionary.
+
+Run from the project root, with the same DATABASE_URL as the application:
+
+    python -m recompress [--batch-size 500] [--samples 2000]
+
+A compression dictionary is trained from a sample of the current
+descriptions and added to ``compression_dictionaries``. Every description
+that is long enough and not already compressed with that dictionary is then
+decoded and written back, one batch of books per transaction, so the
+migration can run while the application serves requests and can be
+interrupted and started again. Application processes pick up the new
+dictionary for reading on their own, and start compressing new
+descriptions with it after a restart.
+"""
+import argparse
+from typing import Dict, Optional
+
+from sqlalchemy import Text, bindparam, func, insert, or_, select, type_coerce, update
+
+from compression import (
+    COMPRESSION_THRESHOLD,
+    decompress,
+    dictionaries,
+    dictionary_id,
+    train_dictionary
+)
+from database import WriteSessionLocal, init_db
+from models import Book, CompressionDictionary
+
+# Books re-encoded per transaction
+BATCH_SIZE = 500
+
+# Descriptions the dictionary is trained from
+SAMPLE_SIZE = 2_000
+
+_books = Book.__table__
+
+# The stored value of the description, text or blob, without decompressing it
+_stored_description = type_coerce(_books.c.description, Text)
+
+
+def train(samples: int = SAMPLE_SIZE) -> Optional[int]:
+    """
+    Train a dictionary from a random sample of the long descriptions and store it.
+
+    Args:
+        samples: Number of descriptions to train from.
+
+    Returns:
+        The ID of the new dictionary, which is now the current one, or None
+        when the descriptions share no phrases to build one from.
+    """
+    with WriteSessionLocal() as session:
+        statement = (
+            select(_books.c.description)
+            .where(or_(
+                func.typeof(_stored_description) == "blob",
+                func.length(_stored_description) >= COMPRESSION_THRESHOLD
+            ))
+            .order_by(func.random())
+            .limit(samples)
+        )
+        data = train_dictionary(session.scalars(statement))
+        if not data:
+            return None
+        new_id = session.execute(
+            insert(CompressionDictionary).values(data=data).returning(CompressionDictionary.id)
+        ).scalar_one()
+        session.commit()
+    dictionaries.add(new_id, data)
+    return new_id
+
+
+def recompress(batch_size: int = BATCH_SIZE) -> Dict[str, int]:
+    """
+    Write back every description not compressed with the current dictionary.
+
+    Books are walked in ID order, one batch per transaction. Values that
+    are already up to date are skipped; the others are decoded and written
+    back, and the column type compresses them again on the way in. The
+    text does not change, so the full-text index is left as it is.
+
+    Args:
+        batch_size: Number of books read and written per transaction.
+
+    Returns:
+        Counters of the books scanned and rewritten.
+    """
+    write = (
+        update(_books)
+        .where(_books.c.id == bindparam("book_id"))
+        .values(description=bindparam("description"))
+    )
+    scanned = rewritten = 0
+    last_id = 0
+    while True:
+        with WriteSessionLocal() as session:
+            rows = session.execute(
+                select(_books.c.id, _stored_description)
+                .where(_books.c.id > last_id, _books.c.description.is_not(None))
+                .order_by(_books.c.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            changes = [
+                {"book_id": book_id, "description": decompress(stored)}
+                for book_id, stored in rows
+                if _is_outdated(stored)
+            ]
+            if changes:
+                session.connection().execute(write, changes)
+            session.commit()
+        scanned += len(rows)
+        rewritten += len(changes)
+        last_id = rows[-1][0]
+    return {"scanned": scanned, "rewritten": rewritten}
+
+
+def _is_outdated(stored) -> bool:
+    """Tell whether a stored description would be encoded differently now."""
+    if isinstance(stored, str):
+        return len(stored.encode("utf-8")) >= COMPRESSION_THRESHOLD
+    # Blobs compressed without a dictionary are stored with ID 0
+    return dictionary_id(stored) != (dictionaries.current or 0)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--samples", type=int, default=SAMPLE_SIZE)
+    args = parser.parse_args()
+
+    init_db()
+    dictionary = train(args.samples)
+    if dictionary is None:
+        print("not enough descriptions to train a dictionary, compressing without one", flush=True)
+    else:
+        print(f"trained dictionary {dictionary}", flush=True)
+    counts = recompress(args.batch_size)
+    print(f"done: scanned={counts['scanned']} rewritten={counts['rewritten']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Rebuild tables whose columns are stored in another order than the models declare.
+
+Run from the project root, with the same DATABASE_URL as the application:
+
+    python -m reorder_columns [--batch-size 500]
+
+SQLite cannot reorder the columns of a table, and it reads a row's values
+in the order they are stored. A ``books`` table created before
+``description`` became its last column keeps the description in the
+middle, where every list query has to read past it. Each such table is
+copied, one batch of rows per transaction and in primary key order, into a
+staging table with the declared layout, so the migration can run while the
+application serves requests and can be interrupted and started again. A
+final transaction copies the rows changed since they were copied, replaces
+the table with the staging table and recreates its indexes.
+"""
+import argparse
+from typing import Dict
+
+from sqlalchemy import MetaData, Table, inspect
+from sqlalchemy.schema import CreateTable, DropTable
+
+from database import Base, init_db, write_engine
+
+# Rows copied per transaction
+BATCH_SIZE = 500
+
+
+def is_outdated(table: Table) -> bool:
+    """Tell whether a table holds the declared columns in another order."""
+    declared = [column.name for column in table.columns]
+    with write_engine.connect() as connection:
+        rows = connection.exec_driver_sql(f'PRAGMA table_info("{table.name}")')
+        stored = [row[1] for row in rows]
+    # Tables that differ from the model in more than the order are left alone
+    return stored != declared and sorted(stored) == sorted(declared)
+
+
+def reorder(table: Table, batch_size: int = BATCH_SIZE) -> Dict[str, int]:
+    """
+    Rebuild a table with its columns in the declared order.
+
+    Args:
+        table: The table to rebuild, with a single-column primary key.
+        batch_size: Number of rows copied per transaction.
+
+    Returns:
+        Counters of the rows copied in batches and caught up at the end.
+    """
+    (key,) = table.primary_key.columns
+    staging = table.to_metadata(MetaData(), name=f"{table.name}_rebuild")
+    columns = ", ".join(f'"{column.name}"' for column in table.columns)
+
+    # A staging table left by an interrupted run is resumed
+    if not inspect(write_engine).has_table(staging.name):
+        with write_engine.begin() as connection:
+            connection.execute(CreateTable(staging))
+
+    copied = 0
+    while True:
+        with write_engine.begin() as connection:
+            inserted = connection.exec_driver_sql(
+                f'INSERT INTO "{staging.name}" ({columns}) '
+                f'SELECT {columns} FROM "{table.name}" '
+                f'WHERE "{key.name}" > '
+                f'(SELECT coalesce(max("{key.name}"), 0) FROM "{staging.name}") '
+                f'ORDER BY "{key.name}" LIMIT ?',
+                (batch_size,)
+            ).rowcount
+        if not inserted:
+            break
+        copied += inserted
+
+    unchanged = " AND ".join(
+        f'staging."{column.name}" IS source."{column.name}"' for column in table.columns
+    )
+    with write_engine.begin() as connection:
+        # Rows inserted, changed or deleted since their batch was copied
+        caught_up = connection.exec_driver_sql(
+            f'INSERT OR REPLACE INTO "{staging.name}" ({columns}) '
+            f'SELECT {columns} FROM "{table.name}" AS source WHERE NOT EXISTS ('
+            f'SELECT 1 FROM "{staging.name}" AS staging '
+            f'WHERE staging."{key.name}" = source."{key.name}" AND {unchanged})'
+        ).rowcount
+        caught_up += connection.exec_driver_sql(
+            f'DELETE FROM "{staging.name}" WHERE "{key.name}" NOT IN '
+            f'(SELECT "{key.name}" FROM "{table.name}")'
+        ).rowcount
+
+        # Dropping the table drops its indexes. Row IDs are kept, so the
+        # full-text index, which is keyed by them, stays valid.
+        connection.execute(DropTable(table))
+        connection.exec_driver_sql(f'ALTER TABLE "{staging.name}" RENAME TO "{table.name}"')
+        for index in table.indexes:
+            index.create(bind=connection)
+    return {"copied": copied, "caught_up": caught_up}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    init_db()
+    for table in Base.metadata.sorted_tables:
+        if not is_outdated(table):
+            continue
+        counts = reorder(table, args.batch_size)
+        print(
+            f"{table.name}: copied={counts['copied']} caught_up={counts['caught_up']}",
+            flush=True
+        )
+    print("done")
+
+
+if __name__ == "__main__":
+    main()
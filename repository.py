@@ -0,0 +1,466 @@
+"""
+Data access functions for the Litestar and SQLAlchemy application.
+
+Every function takes a synchronous :class:`~sqlalchemy.orm.Session` as its
+first argument. Request handlers run them with ``await db.read(function, ...)``
+or ``await db.write(function, ...)``, which executes them either on an async
+session through ``run_sync`` or in a database thread pool (see
+``database.py``). Either way the query code stays in the familiar ORM style
+and the event loop is never blocked.
+
+Books are indexed for full-text search by the application rather than by
+triggers (see ``search.py``), so every function that writes books also
+updates the index, in the same transaction.
+"""
+from functools import lru_cache
+from typing import Callable, List, Optional, Tuple
+
+from sqlalchemy import Float, bindparam, delete, func, insert, literal, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from fieldsets import FIELDS, load_fields
+from filters import filter_conditions, range_columns
+from models import Book
+from pagination import Page, page_of, page_query, parse_sort
+from search import FTS_COLUMNS, index_books, unindex_books
+from validation import FIELD_TYPES
+
+# Maximum number of items accepted by a bulk request
+BULK_MAX_ITEMS = 10_000
+
+# Maximum number of IDs accepted by a bulk update or delete
+BULK_MAX_IDS = 100_000
+
+# Number of rows written per transaction by the bulk functions
+BULK_CHUNK_SIZE = 500
+
+# Most books a range filter may match for a page to be read through the
+# range's index and sorted, instead of in the order of the sort key's index
+SORTED_MATCHES_LIMIT = 1000
+
+# The single-book statements are built once, with bound parameters, and
+# reused for every request. Building a statement and computing its cache
+# key is a visible part of a cheap request; a reused statement object keeps
+# its cache key, so executing it goes straight to the compiled form cached
+# by SQLAlchemy.
+_books = Book.__table__
+
+INSERT_BOOK = insert(_books).returning(*_books.c)
+
+DELETE_BOOK = (
+    delete(_books)
+    .where(_books.c.id == bindparam("book_id"))
+    .returning(_books.c.id)
+)
+
+
+# SQLite hands RETURNING values back before applying the column affinity,
+# so a whole-number price comes back as an int rather than the stored REAL
+_FLOAT_COLUMNS = tuple(column.name for column in _books.c if isinstance(column.type, Float))
+
+
+def _book_from_row(row) -> Book:
+    """Build a detached book from a ``RETURNING`` row of every column."""
+    values = dict(row._mapping)
+    for name in _FLOAT_COLUMNS:
+        if values[name] is not None:
+            values[name] = float(values[name])
+    return Book(**values)
+
+
+@lru_cache(maxsize=None)
+def _select_book(fields: Optional[Tuple[str, ...]]):
+    """Build the SELECT of one book by ID, loading the given columns."""
+    statement = select(Book).where(Book.id == bindparam("book_id"))
+    return load_fields(statement, list(fields) if fields else None)
+
+
+@lru_cache(maxsize=None)
+def _update_book(names: Tuple[str, ...]):
+    """Build the UPDATE ... RETURNING of one book by ID, setting the given columns."""
+    return (
+        update(_books)
+        .where(_books.c.id == bindparam("book_id"))
+        .values({name: bindparam(name) for name in names})
+        .returning(*_books.c)
+    )
+
+
+def list_books_query(
+    sort: str,
+    limit: int,
+    after: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+    in_sort_order: bool = True,
+    **filters
+):
+    """
+    Build the Core ``select()`` that :func:`list_books` runs, without running it.
+
+    Args:
+        sort: Sort expression.
+        limit: Maximum number of books to return.
+        after: Cursor of the previous page.
+        fields: Columns to load, or None for all of them.
+        in_sort_order: Whether to read the books in the order of the sort
+            key's index, with ranges on other columns kept off their
+            indexes, or through the index of a range, with the cursor kept
+            off the sort key's index.
+        filters: Keyword arguments for :func:`filters.filter_conditions`.
+
+    Returns:
+        The statement, limited to ``limit + 1`` rows.
+    """
+    sort_key, _ = parse_sort(sort)
+
+    # Only read the requested columns (plus the keys of the cursor)
+    columns = _books.c
+    if fields is not None:
+        names = set(fields).union((sort_key, "id"))
+        columns = [_books.c[name] for name in FIELDS if name in names]
+
+    conditions = filter_conditions(sort_key=sort_key if in_sort_order else None, **filters)
+    return page_query(select(*columns).where(*conditions), sort, limit, after, in_sort_order)
+
+
+def _read_in_sort_order(session: Session, sort_key: str, filters: dict) -> bool:
+    """
+    Tell whether a page should be read in the order of the sort key's index.
+
+    Reading in index order stops after a page of matches, but it walks the
+    sort key's index (the whole table for ``id``) past every book a range
+    on another column rejects. When the author or a range on the sort key
+    itself narrows that index, or there is no other range, it is the right
+    plan. Otherwise the matches of the ranges are counted, up to
+    :data:`SORTED_MATCHES_LIMIT`: that few are cheaper to read through the
+    range's index and sort, while more are dense enough in any order to
+    fill a page soon.
+    """
+    ranged = range_columns(**filters)
+    if filters.get("author") is not None or sort_key in ranged or not ranged:
+        return True
+    matches = (
+        select(literal(1))
+        .where(*filter_conditions(**filters))
+        .limit(SORTED_MATCHES_LIMIT + 1)
+        .subquery()
+    )
+    count = session.execute(select(func.count()).select_from(matches)).scalar_one()
+    return count > SORTED_MATCHES_LIMIT
+
+
+def list_books(
+    session: Session,
+    sort: str,
+    limit: int,
+    after: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+    **filters
+) -> Page:
+    """
+    Get a page of books.
+
+    The page is read with a Core ``select()`` over the books table, and its
+    items are plain rows rather than :class:`Book` instances. A list is
+    only ever serialized, so building ORM objects, with their identity map
+    entries and instrumentation state, would be wasted work. Whether the
+    books are read in the order of the sort key's index or through a range
+    filter's index is decided per request (see :func:`_read_in_sort_order`).
+
+    Args:
+        session: SQLAlchemy database session.
+        sort: Sort expression.
+        limit: Maximum number of books to return.
+        after: Cursor of the previous page.
+        fields: Columns to load, or None for all of them.
+        filters: Keyword arguments for :func:`filters.filter_conditions`.
+
+    Returns:
+        The requested page, as rows of the books table.
+    """
+    sort_key, _ = parse_sort(sort)
+    in_sort_order = _read_in_sort_order(session, sort_key, filters)
+    statement = list_books_query(sort, limit, after, fields, in_sort_order, **filters)
+    return page_of(session.execute(statement).all(), sort, limit)
+
+
+def get_book(session: Session, book_id: int, fields: Optional[List[str]] = None) -> Optional[Book]:
+    """
+    Get a book by ID.
+
+    Args:
+        session: SQLAlchemy database session.
+        book_id: The ID of the book.
+        fields: Columns to load, or None for all of them.
+
+    Returns:
+        The book, or None if it does not exist.
+    """
+    statement = _select_book(tuple(fields) if fields else None)
+    return session.execute(statement, {"book_id": book_id}).scalar_one_or_none()
+
+
+def create_book(session: Session, data: dict) -> Book:
+    """
+    Create a new book.
+
+    The book is written with a single ``INSERT ... RETURNING *``, which
+    also hands back the ID and the timestamps generated by the database,
+    so no refresh is needed. The new book is then added to the full-text
+    index.
+
+    Args:
+        session: SQLAlchemy database session.
+        data: Book data from the request body.
+
+    Returns:
+        The created book, detached from the session.
+    """
+    row = session.execute(INSERT_BOOK, {
+        "title": data["title"],
+        "author": data["author"],
+        "description": data.get("description"),
+        "price": data.get("price"),
+        "published_year": data.get("published_year")
+    }).one()
+    index_books(session, [row.id])
+    session.commit()
+    return _book_from_row(row)
+
+
+def update_book(session: Session, book_id: int, data: dict) -> Optional[Book]:
+    """
+    Update an existing book.
+
+    The change is a single ``UPDATE books SET ... WHERE id = ? RETURNING *``
+    statement: there is no SELECT to load the book first and no refresh
+    afterwards, and an empty result means the book does not exist. A change
+    to an indexed column is followed by a DELETE and an INSERT on the
+    full-text index that replace the book's entry.
+
+    Args:
+        session: SQLAlchemy database session.
+        book_id: The ID of the book to update.
+        data: Updated book data.
+
+    Returns:
+        The updated book, detached from the session, or None if it does
+        not exist.
+    """
+    values = {name: data[name] for name in FIELD_TYPES if name in data}
+    if not values:
+        # Nothing to change, so there is nothing to write either
+        return get_book(session, book_id)
+
+    statement = _update_book(tuple(values))
+    row = session.execute(statement, {"book_id": book_id, **values}).first()
+    if row is not None and any(name in FTS_COLUMNS for name in values):
+        unindex_books(session, [book_id])
+        index_books(session, [book_id])
+    session.commit()
+    if row is None:
+        return None
+
+    # Build the book from the returned row instead of loading it through
+    # the identity map
+    return _book_from_row(row)
+
+
+def delete_book(session: Session, book_id: int) -> bool:
+    """
+    Delete a book.
+
+    A single ``DELETE ... RETURNING id`` both removes the book and tells
+    whether it existed, without loading it first. An existing book is then
+    removed from the full-text index.
+
+    Args:
+        session: SQLAlchemy database session.
+        book_id: The ID of the book to delete.
+
+    Returns:
+        True if the book was deleted, False if it does not exist.
+    """
+    deleted = session.execute(DELETE_BOOK, {"book_id": book_id}).first()
+    if deleted is not None:
+        unindex_books(session, [book_id])
+    session.commit()
+    return deleted is not None
+
+
+def bulk_create_books(
+    session: Session,
+    items: List[Tuple[int, dict]],
+    chunk_size: int = BULK_CHUNK_SIZE
+) -> Tuple[List[dict], List[dict]]:
+    """
+    Insert many books with batched INSERT ... RETURNING statements.
+
+    Each chunk is inserted with a single executemany, which SQLAlchemy turns
+    into multi-row ``INSERT ... VALUES (...), (...) RETURNING id`` statements
+    ("insertmanyvalues"), and committed on its own. A chunk that fails is
+    rolled back and reported without affecting the others.
+
+    Args:
+        session: SQLAlchemy database session.
+        items: Validated book data, each paired with its index in the request.
+        chunk_size: Number of books per transaction.
+
+    Returns:
+        The created books as ``{"index", "id"}`` and the failed ones as
+        ``{"index", "error"}``.
+    """
+    created, errors = [], []
+    table = Book.__table__
+    statement = insert(table).returning(table.c.id)
+
+    for start in range(0, len(items), chunk_size):
+        chunk = items[start:start + chunk_size]
+
+        # executemany needs every row to have the same keys
+        rows = [{name: values.get(name) for name in FIELD_TYPES} for _, values in chunk]
+        try:
+            # SQLite does not promise any order for RETURNING, but it gives
+            # each new row the largest rowid so far plus one. Sorted IDs are
+            # therefore in the order of the rows. (Asking SQLAlchemy to sort
+            # by parameter order would fall back to one INSERT per row.)
+            ids = sorted(session.scalars(statement, rows))
+            index_books(session, ids)
+            session.commit()
+        except SQLAlchemyError as error:
+            session.rollback()
+            message = f"Database error: {error.__class__.__name__}"
+            errors.extend({"index": index, "error": message} for index, _ in chunk)
+            continue
+
+        created.extend({"index": index, "id": book_id} for (index, _), book_id in zip(chunk, ids))
+
+    return created, errors
+
+
+def _apply_in_chunks(
+    session: Session,
+    build: Callable,
+    ids: Optional[List[int]],
+    filters: Optional[dict],
+    chunk_size: int,
+    indexed: bool
+) -> List[int]:
+    """
+    Run a set-based UPDATE or DELETE over the selected books, chunk by chunk.
+
+    Each chunk is one ``... WHERE id IN (...) RETURNING id`` statement in its
+    own transaction, so the write lock is only held briefly. With a filter,
+    the chunks walk the matching rows in ID order, which also keeps an
+    update from selecting rows it has already changed.
+
+    Args:
+        session: SQLAlchemy database session.
+        build: Builds the statement for a given WHERE condition.
+        ids: IDs of the books to change, or None to use ``filters``.
+        filters: Keyword arguments for :func:`filters.filter_conditions`.
+        chunk_size: Number of rows per statement.
+        indexed: Whether the statement changes or removes indexed text. The
+            affected books of each chunk are then taken out of the
+            full-text index, and the ones still there added back.
+
+    Returns:
+        The IDs of the affected books.
+
+    Raises:
+        ValueError: If ``filters`` restrict nothing, which would change
+            every book.
+    """
+    table = Book.__table__
+    affected = []
+
+    def apply(condition) -> List[int]:
+        chunk = list(session.scalars(build(condition).returning(table.c.id)))
+        if indexed and chunk:
+            unindex_books(session, chunk)
+            # Deleted books are no longer there to be indexed
+            index_books(session, chunk)
+        session.commit()
+        return chunk
+
+    if ids is not None:
+        for start in range(0, len(ids), chunk_size):
+            affected.extend(apply(table.c.id.in_(ids[start:start + chunk_size])))
+        return affected
+
+    conditions = filter_conditions(**filters)
+    if not conditions:
+        raise ValueError("The filter selects every book")
+    last_id = None
+    while True:
+        selection = select(table.c.id).where(*conditions)
+        if last_id is not None:
+            selection = selection.where(table.c.id > last_id)
+        selection = selection.order_by(table.c.id).limit(chunk_size)
+
+        chunk = apply(table.c.id.in_(selection.scalar_subquery()))
+        affected.extend(chunk)
+        if len(chunk) < chunk_size:
+            return affected
+        last_id = max(chunk)
+
+
+def bulk_update_books(
+    session: Session,
+    values: dict,
+    ids: Optional[List[int]] = None,
+    filters: Optional[dict] = None,
+    chunk_size: int = BULK_CHUNK_SIZE
+) -> List[int]:
+    """
+    Set the same values on many books with set-based UPDATE statements.
+
+    Args:
+        session: SQLAlchemy database session.
+        values: Validated column values to set.
+        ids: IDs of the books to update, or None to use ``filters``.
+        filters: Collection filters selecting the books to update.
+        chunk_size: Number of rows per statement.
+
+    Returns:
+        The IDs of the updated books.
+    """
+    table = Book.__table__
+    return _apply_in_chunks(
+        session,
+        lambda condition: update(table).where(condition).values(**values),
+        ids,
+        filters,
+        chunk_size,
+        indexed=any(name in FTS_COLUMNS for name in values)
+    )
+
+
+def bulk_delete_books(
+    session: Session,
+    ids: Optional[List[int]] = None,
+    filters: Optional[dict] = None,
+    chunk_size: int = BULK_CHUNK_SIZE
+) -> List[int]:
+    """
+    Delete many books with set-based DELETE statements.
+
+    Args:
+        session: SQLAlchemy database session.
+        ids: IDs of the books to delete, or None to use ``filters``.
+        filters: Collection filters selecting the books to delete.
+        chunk_size: Number of rows per statement.
+
+    Returns:
+        The IDs of the deleted books.
+    """
+    table = Book.__table__
+    return _apply_in_chunks(
+        session,
+        lambda condition: delete(table).where(condition),
+        ids,
+        filters,
+        chunk_size,
+        indexed=True
+    )
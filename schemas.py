@@ -0,0 +1,59 @@
+"""
+Request models for the Litestar and SQLAlchemy application.
+
+The models are ``msgspec.Struct`` types. Litestar decodes and validates
+request bodies into them before the handler runs, so malformed input is
+rejected with a 400 response before any database work is queued. Responses
+built from ``Book`` instances go through the DTOs of ``dto.py``.
+"""
+from typing import Annotated, Optional, Union
+
+import msgspec
+from msgspec import UNSET, Meta, UnsetType
+
+from validation import MAX_LENGTHS
+
+Title = Annotated[str, Meta(max_length=MAX_LENGTHS["title"])]
+Author = Annotated[str, Meta(max_length=MAX_LENGTHS["author"])]
+
+
+class BookCreate(msgspec.Struct, forbid_unknown_fields=True):
+    """Body of a request creating a book."""
+
+    title: Title
+    author: Author
+    description: Optional[str] = None
+    price: Optional[float] = None
+    published_year: Optional[int] = None
+
+
+class BookUpdate(msgspec.Struct, forbid_unknown_fields=True):
+    """
+    Body of a request updating a book.
+
+    Every field is optional. A field left out of the body is not changed,
+    while an explicit ``null`` clears the nullable ones.
+    """
+
+    title: Union[Title, UnsetType] = UNSET
+    author: Union[Author, UnsetType] = UNSET
+    description: Union[Optional[str], UnsetType] = UNSET
+    price: Union[Optional[float], UnsetType] = UNSET
+    published_year: Union[Optional[int], UnsetType] = UNSET
+
+
+def struct_values(data: msgspec.Struct) -> dict:
+    """
+    Return the fields of a request model that were set, as a dictionary.
+
+    Args:
+        data: A decoded request body.
+
+    Returns:
+        The field values, without the fields left unset.
+    """
+    return {
+        name: value
+        for name, value in msgspec.structs.asdict(data).items()
+        if value is not UNSET
+    }
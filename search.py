@@ -0,0 +1,228 @@
+"""
+Full-text search for the Litestar and SQLAlchemy application.
+
+Books are indexed in an SQLite FTS5 virtual table that keeps its own copy
+of the indexed text. Long descriptions are stored compressed, which only
+the application can read, so the index is kept in sync by the application
+itself rather than by triggers: the write functions of ``repository.py``
+index new and changed books, and drop deleted and changed ones from the
+index by book ID, in the same transaction as the write. Since the index
+holds the text it indexed, dropping a book never depends on the current
+row, and a write made to ``books`` outside the application only leaves that
+book missing from search results, or found by its old text, until the
+index is rebuilt with ``python -m search``.
+"""
+from typing import List, Optional, Union
+
+from sqlalchemy import delete, func, insert, select, text, true
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import column, table
+
+from compression import DECOMPRESS_FUNCTION
+from models import Book
+
+# Name of the FTS5 virtual table
+FTS_TABLE = "books_fts"
+
+# Columns of ``books`` that are indexed
+FTS_COLUMNS = ("title", "author", "description")
+
+# Relative weights of the title, author and description columns in BM25
+BM25_WEIGHTS = (10.0, 5.0, 1.0)
+
+# Markers placed around matching terms in highlights and snippets
+HIGHLIGHT_OPEN = "<mark>"
+HIGHLIGHT_CLOSE = "</mark>"
+
+# Maximum number of tokens in a description snippet
+SNIPPET_TOKENS = 16
+
+CREATE_FTS_TABLE = f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5({', '.join(FTS_COLUMNS)})"
+
+# Objects of earlier versions of the index, which read the books through
+# the decompressing SQL function and only worked on the application's own
+# connections
+_LEGACY_OBJECTS = {
+    "books_fts_ai": "TRIGGER",
+    "books_fts_ad": "TRIGGER",
+    "books_fts_au": "TRIGGER",
+    # Shares its name with the content table FTS5 keeps for the index now
+    "books_fts_content": "VIEW",
+}
+
+SEARCH_QUERY = text(f"""
+SELECT
+    books.id AS id,
+    books.title AS title,
+    books.author AS author,
+    bm25({FTS_TABLE}, {', '.join(str(w) for w in BM25_WEIGHTS)}) AS score,
+    highlight({FTS_TABLE}, 0, :open, :close) AS title_highlight,
+    highlight({FTS_TABLE}, 1, :open, :close) AS author_highlight,
+    snippet({FTS_TABLE}, 2, :open, :close, '…', {SNIPPET_TOKENS}) AS description_snippet
+FROM {FTS_TABLE}
+JOIN books ON books.id = {FTS_TABLE}.rowid
+WHERE {FTS_TABLE} MATCH :query
+ORDER BY score
+LIMIT :limit
+""")
+
+_books = Book.__table__
+_fts = table(FTS_TABLE, column("rowid"), *(column(name) for name in FTS_COLUMNS))
+
+# The indexed columns of the books, with descriptions decompressed by the
+# SQL function the application registers on its connections
+_indexed_columns = (
+    _books.c.title,
+    _books.c.author,
+    getattr(func, DECOMPRESS_FUNCTION)(_books.c.description),
+)
+
+
+def index_books(connection: Union[Connection, Session], ids: Optional[List[int]] = None) -> None:
+    """
+    Add books to the full-text index with their current text.
+
+    Args:
+        connection: Connection or session of the write transaction.
+        ids: IDs of the books to index, or None for every book. IDs of
+            books that do not exist are ignored.
+    """
+    condition = true() if ids is None else _books.c.id.in_(ids)
+    selection = select(_books.c.id, *_indexed_columns).where(condition)
+    connection.execute(insert(_fts).from_select(("rowid",) + FTS_COLUMNS, selection))
+
+
+def unindex_books(connection: Union[Connection, Session], ids: List[int]) -> None:
+    """
+    Remove books from the full-text index.
+
+    The index holds its own copy of the text, so a book is removed by ID
+    whatever its row holds now, or after the row is gone.
+
+    Args:
+        connection: Connection or session of the write transaction.
+        ids: IDs of the books to remove.
+    """
+    connection.execute(delete(_fts).where(_fts.c.rowid.in_(ids)))
+
+
+def create_search_index(engine: Engine) -> None:
+    """
+    Create the FTS5 table if it does not exist yet.
+
+    When the table is created for an existing database, every book is
+    indexed. An index from an earlier version, which either read the books
+    through a view and triggers or kept no copy of the text, is dropped and
+    created again.
+
+    Args:
+        engine: The engine of the database to index.
+    """
+    with engine.begin() as connection:
+        for name, kind in _LEGACY_OBJECTS.items():
+            found = connection.exec_driver_sql(
+                "SELECT 1 FROM sqlite_master WHERE type = ? AND name = ?",
+                (kind.lower(), name)
+            ).scalar()
+            if found:
+                connection.exec_driver_sql(f"DROP {kind} {name}")
+        definition = connection.exec_driver_sql(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?",
+            (FTS_TABLE,)
+        ).scalar()
+        if definition is not None and "content=" in definition:
+            connection.exec_driver_sql(f"DROP TABLE {FTS_TABLE}")
+            definition = None
+        if definition is None:
+            connection.exec_driver_sql(CREATE_FTS_TABLE)
+            index_books(connection)
+
+
+def rebuild_search_index(engine: Engine) -> None:
+    """
+    Index every book again from scratch.
+
+    Needed after books were written outside the application, which leaves
+    them out of the index or indexed with outdated text.
+
+    Args:
+        engine: The engine of the database to index.
+    """
+    with engine.begin() as connection:
+        connection.execute(delete(_fts))
+        index_books(connection)
+
+
+def to_match_expression(query: str) -> str:
+    """
+    Turn free text into a safe FTS5 MATCH expression.
+
+    Each whitespace separated term is quoted, so characters with a meaning
+    in the FTS5 query syntax are searched for literally, and all terms must
+    match. A trailing ``*`` on a term is kept as a prefix search.
+
+    Args:
+        query: The text entered by the user.
+
+    Returns:
+        The MATCH expression, or an empty string if there are no terms.
+    """
+    terms = []
+    for term in query.split():
+        prefix = term.endswith("*")
+        term = term.rstrip("*")
+        if term:
+            quoted = '"' + term.replace('"', '""') + '"'
+            terms.append(quoted + ("*" if prefix else ""))
+    return " ".join(terms)
+
+
+def search_books(db_session: Session, query: str, limit: int) -> List[dict]:
+    """
+    Search books by title, author and description.
+
+    Args:
+        db_session: SQLAlchemy database session.
+        query: Free text to search for.
+        limit: Maximum number of results.
+
+    Returns:
+        Matching books, best match first, with highlighted fields.
+    """
+    expression = to_match_expression(query)
+    if not expression:
+        return []
+
+    rows = db_session.execute(SEARCH_QUERY, {
+        "query": expression,
+        "limit": limit,
+        "open": HIGHLIGHT_OPEN,
+        "close": HIGHLIGHT_CLOSE,
+    })
+    return [
+        {
+            "id": row.id,
+            "title": row.title,
+            "author": row.author,
+            "score": -row.score,
+            "highlights": {
+                "title": row.title_highlight,
+                "author": row.author_highlight,
+                "description": row.description_snippet,
+            },
+        }
+        for row in rows
+    ]
+
+
+def main() -> None:
+    from database import init_db, write_engine
+
+    init_db()
+    rebuild_search_index(write_engine)
+    print("done")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Streaming helpers for the Litestar and SQLAlchemy application.
+
+This module turns a query over the books table into a JSON array that is
+written to the client a chunk at a time, so memory use stays flat no matter
+how large the catalog grows.
+"""
+from typing import AsyncIterator
+
+from sqlalchemy import select
+
+from database import AsyncSessionLocal
+from models import Book
+from serialization import BookRecord, encode_records
+
+# Number of rows fetched from the database cursor, and encoded, per chunk
+STREAM_CHUNK_SIZE = 1000
+
+
+async def iter_books_json(chunk_size: int = STREAM_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """
+    Yield every book as part of a single JSON array.
+
+    The generator opens its own session because it keeps running after the
+    route handler has returned, once the request-scoped session is closed.
+    Rows are read with a Core ``select()``, without building ORM objects,
+    and streamed with ``yield_per`` so only one chunk of them is alive at
+    any time. Each chunk is held as ``BookRecord`` instances and encoded in
+    one call, without a dictionary per book.
+
+    Args:
+        chunk_size: Number of books encoded into each yielded chunk.
+
+    Yields:
+        Byte chunks that together form a JSON array of books.
+    """
+    async with AsyncSessionLocal() as session:
+        table = Book.__table__
+        statement = select(table).order_by(table.c.id).execution_options(yield_per=chunk_size)
+        result = await session.stream(statement)
+
+        yield b"["
+        first = True
+        async for rows in result.partitions():
+            chunk = encode_records([BookRecord(**row._mapping) for row in rows])
+            yield chunk if first else b"," + chunk
+            first = False
+        yield b"]"
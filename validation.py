@@ -0,0 +1,116 @@
+"""
+Validation of book data for the Litestar and SQLAlchemy application.
+
+The single-book endpoints rely on the database to reject bad input, but the
+bulk endpoints need to report problems item by item without aborting the
+whole batch, so they check every item up front with these helpers.
+"""
+from typing import Any, List, Optional, Tuple
+
+# Expected Python types of the writable book fields
+FIELD_TYPES = {
+    "title": str,
+    "author": str,
+    "description": str,
+    "price": (int, float),
+    "published_year": int,
+}
+
+# Fields that must be present when creating a book
+REQUIRED_FIELDS = ("title", "author")
+
+# Maximum lengths of the String columns
+MAX_LENGTHS = {"title": 100, "author": 100}
+
+# Expected Python types of the collection filters (see filters.py)
+FILTER_TYPES = {
+    "author": str,
+    "title_prefix": str,
+    "min_year": int,
+    "max_year": int,
+    "min_price": (int, float),
+    "max_price": (int, float),
+}
+
+
+def validate_book_data(data: Any, partial: bool = False) -> dict:
+    """
+    Check one book's data and return the writable fields.
+
+    Args:
+        data: The decoded JSON item.
+        partial: Whether this is an update, in which case no field is required.
+
+    Returns:
+        The known fields of ``data``.
+
+    Raises:
+        ValueError: With a message describing the first problem found.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Expected an object")
+
+    unknown = set(data).difference(FIELD_TYPES)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+
+    if not partial:
+        for name in REQUIRED_FIELDS:
+            if data.get(name) is None:
+                raise ValueError(f"'{name}' is required")
+
+    values = {}
+    for name, value in data.items():
+        if value is None:
+            if name in REQUIRED_FIELDS:
+                raise ValueError(f"'{name}' cannot be null")
+        elif isinstance(value, bool) or not isinstance(value, FIELD_TYPES[name]):
+            raise ValueError(f"'{name}' has the wrong type")
+        elif name in MAX_LENGTHS and len(value) > MAX_LENGTHS[name]:
+            raise ValueError(f"'{name}' is longer than {MAX_LENGTHS[name]} characters")
+        values[name] = value
+    return values
+
+
+def validate_selection(data: dict, max_ids: int) -> Tuple[Optional[List[int]], Optional[dict]]:
+    """
+    Check the rows selected by a bulk update or delete request.
+
+    A request selects rows either with ``"ids"``, a list of book IDs, or
+    with ``"filter"``, a non-empty object of collection filters.
+
+    Args:
+        data: The decoded request body.
+        max_ids: Maximum number of IDs accepted.
+
+    Returns:
+        The IDs and the filters; exactly one of them is not None.
+
+    Raises:
+        ValueError: With a message describing the first problem found.
+    """
+    ids, filters = data.get("ids"), data.get("filter")
+    if (ids is None) == (filters is None):
+        raise ValueError("Exactly one of 'ids' or 'filter' is required")
+
+    if ids is not None:
+        if not isinstance(ids, list) or not all(
+            isinstance(book_id, int) and not isinstance(book_id, bool) for book_id in ids
+        ):
+            raise ValueError("'ids' must be a list of integers")
+        if len(ids) > max_ids:
+            raise ValueError(f"At most {max_ids} IDs are accepted per request")
+        return ids, None
+
+    if not isinstance(filters, dict) or not filters:
+        raise ValueError("'filter' must be a non-empty object")
+    unknown = set(filters).difference(FILTER_TYPES)
+    if unknown:
+        raise ValueError(f"Unknown filters: {', '.join(sorted(unknown))}")
+    for name, value in filters.items():
+        if isinstance(value, bool) or not isinstance(value, FILTER_TYPES[name]):
+            raise ValueError(f"Filter '{name}' has the wrong type")
+        # An empty string would be skipped by the filters and select every book
+        if isinstance(value, str) and not value:
+            raise ValueError(f"Filter '{name}' must not be empty")
+    return None, filters